@@ -83,6 +83,49 @@ def _best_resolution_token(text: str) -> int | None:
     except ValueError:
         return None
 
+# Human-readable check messages: code -> (ok template, fail template).
+# Templates are filled from the check's meta, so stored results only need
+# code/ok/meta and messages can be rendered at read time.
+MESSAGES: dict[str, tuple[str, str]] = {
+    "porn_block": ("No porn keywords detected", "Porn keyword detected: {hit}"),
+    "dot_style": ("No spaces or parentheses", "Contains spaces/parentheses (not scene-dot style)"),
+    "banned_quality": ("No banned quality tokens", "Banned token detected: {hit}"),
+    "group_suffix": ("Ends with -GROUP", "Missing -GROUP suffix"),
+    "pattern_movie": ("Matches Movie pattern", "Does not match Movie pattern (needs .YEAR., .RES., source, -GROUP)"),
+    "pattern_tv": ("Matches TV Episode/Season pattern", "Does not match TV patterns (needs SxxEyy or Sxx, res, source, -GROUP)"),
+    "min_resolution": ("Resolution token {res_p}p >= {min_res_p}p", "Resolution token {res_p}p is below {min_res_p}p"),
+    "category": ("Category OK", "Unknown category: {category}"),
+    "has_video": ("Video files detected: {video_count} / {total}", "No common video extensions found in torrent file list"),
+    "suspicious_files": ("No suspicious file types detected", "Suspicious file types present: {count}"),
+    "samples": ("No sample folder/files detected", "Sample folder/files detected: {count}"),
+    "file_count": ("File count looks normal ({total})", "Very large file count ({total}) — possible pack/collection or messy torrent"),
+    "video_size": ("Largest video file size OK ({largest_mb:.1f} MB)", "Largest video file is very small ({largest_mb:.1f} MB) — suspicious"),
+    "missing_episodes": ("No missing episodes ({episodes_found} found)", "Missing episodes: {count}"),
+    "duplicate_episodes": ("No duplicate episodes", "Duplicate episodes: {count}"),
+    "mixed_resolution": ("Consistent resolution across episodes ({resolutions[0]})", "Mixed resolutions across episodes: {count}"),
+    "mixed_group": ("Consistent release group across episodes ({groups[0]})", "Mixed release groups across episodes: {count}"),
+    "partial_season": ("Partial season pack, starts at {starts_at}", "Partial season pack, starts at {starts_at}"),
+}
+
+# Used instead of MESSAGES when a check carries no meta
+MESSAGES_NO_META: dict[str, str] = {
+    "min_resolution": "No resolution token found (e.g. 1080p)",
+    "video_size": "Video size heuristic skipped (torrent did not provide sizes)",
+    "mixed_resolution": "No resolution tokens found in episode names",
+    "mixed_group": "No release group found in episode names",
+}
+
+def render_message(code: str, ok: bool, meta: dict[str, Any] | None) -> str:
+    if not meta and code in MESSAGES_NO_META:
+        return MESSAGES_NO_META[code]
+    templates = MESSAGES.get(code)
+    if not templates:
+        return code
+    try:
+        return templates[0 if ok else 1].format(**(meta or {}))
+    except (KeyError, IndexError, ValueError):
+        return code
+
 @dataclass
 class CheckResult:
     ok: bool
@@ -90,48 +133,29 @@ class CheckResult:
     message: str
     meta: dict[str, Any] | None = None
 
+def _check(ok: bool, code: str, meta: dict[str, Any] | None = None) -> CheckResult:
+    return CheckResult(ok=ok, code=code, message=render_message(code, ok, meta), meta=meta)
+
 def analyze_title(category: str, title: str, min_res_p: int, enable_porn_block: bool) -> dict[str, Any]:
     checks: list[CheckResult] = []
 
     if enable_porn_block:
         porn_hit = _contains_any_segment(title, PORN_TOKENS)
-        checks.append(CheckResult(
-            ok=(porn_hit is None),
-            code="porn_block",
-            message="No porn keywords detected" if porn_hit is None else f"Porn keyword detected: {porn_hit}",
-            meta={"hit": porn_hit} if porn_hit else None
-        ))
+        checks.append(_check(porn_hit is None, "porn_block", {"hit": porn_hit} if porn_hit else None))
         if porn_hit is not None:
             return {"verdict": "fail", "checks": [c.__dict__ for c in checks], "reason_key": "porn"}
 
-    checks.append(CheckResult(
-        ok=not _has_spaces_or_parens(title),
-        code="dot_style",
-        message="No spaces or parentheses" if not _has_spaces_or_parens(title) else "Contains spaces/parentheses (not scene-dot style)"
-    ))
+    checks.append(_check(not _has_spaces_or_parens(title), "dot_style"))
 
     banned_hit = _contains_any_segment(title, BANNED_QUALITY_TOKENS)
-    checks.append(CheckResult(
-        ok=(banned_hit is None),
-        code="banned_quality",
-        message="No banned quality tokens" if banned_hit is None else f"Banned token detected: {banned_hit}",
-        meta={"hit": banned_hit} if banned_hit else None
-    ))
+    checks.append(_check(banned_hit is None, "banned_quality", {"hit": banned_hit} if banned_hit else None))
 
-    checks.append(CheckResult(
-        ok=_has_group_suffix(title),
-        code="group_suffix",
-        message="Ends with -GROUP" if _has_group_suffix(title) else "Missing -GROUP suffix"
-    ))
+    checks.append(_check(_has_group_suffix(title), "group_suffix"))
 
     # Category pattern
     if category == "Movie":
         m = MOVIE_REGEX.match(title)
-        checks.append(CheckResult(
-            ok=bool(m),
-            code="pattern_movie",
-            message="Matches Movie pattern" if m else "Does not match Movie pattern (needs .YEAR., .RES., source, -GROUP)"
-        ))
+        checks.append(_check(bool(m), "pattern_movie"))
         res = None
         if m:
             # capture group (both are res)
@@ -143,27 +167,14 @@ def analyze_title(category: str, title: str, min_res_p: int, enable_porn_block:
             res = _best_resolution_token(title)
 
         if res is not None:
-            checks.append(CheckResult(
-                ok=(res >= min_res_p),
-                code="min_resolution",
-                message=f"Resolution token {res}p >= {min_res_p}p" if res >= min_res_p else f"Resolution token {res}p is below {min_res_p}p",
-                meta={"res_p": res, "min_res_p": min_res_p}
-            ))
+            checks.append(_check(res >= min_res_p, "min_resolution", {"res_p": res, "min_res_p": min_res_p}))
         else:
-            checks.append(CheckResult(
-                ok=False,
-                code="min_resolution",
-                message="No resolution token found (e.g. 1080p)",
-            ))
+            checks.append(_check(False, "min_resolution"))
 
     elif category == "TV":
         m1 = TV_EP_REGEX.match(title)
         m2 = TV_SEASON_REGEX.match(title)
-        checks.append(CheckResult(
-            ok=bool(m1 or m2),
-            code="pattern_tv",
-            message="Matches TV Episode/Season pattern" if (m1 or m2) else "Does not match TV patterns (needs SxxEyy or Sxx, res, source, -GROUP)"
-        ))
+        checks.append(_check(bool(m1 or m2), "pattern_tv"))
         m = m1 or m2
         res = None
         if m:
@@ -175,24 +186,11 @@ def analyze_title(category: str, title: str, min_res_p: int, enable_porn_block:
             res = _best_resolution_token(title)
 
         if res is not None:
-            checks.append(CheckResult(
-                ok=(res >= min_res_p),
-                code="min_resolution",
-                message=f"Resolution token {res}p >= {min_res_p}p" if res >= min_res_p else f"Resolution token {res}p is below {min_res_p}p",
-                meta={"res_p": res, "min_res_p": min_res_p}
-            ))
+            checks.append(_check(res >= min_res_p, "min_resolution", {"res_p": res, "min_res_p": min_res_p}))
         else:
-            checks.append(CheckResult(
-                ok=False,
-                code="min_resolution",
-                message="No resolution token found (e.g. 1080p)",
-            ))
+            checks.append(_check(False, "min_resolution"))
     else:
-        checks.append(CheckResult(
-            ok=False,
-            code="category",
-            message=f"Unknown category: {category}"
-        ))
+        checks.append(_check(False, "category", {"category": category}))
 
     verdict = "pass" if all(c.ok for c in checks) else "fail"
     return {"verdict": verdict, "checks": [c.__dict__ for c in checks], "reason_key": "naming" if verdict == "fail" else None}
@@ -214,40 +212,28 @@ def analyze_files(file_entries) -> dict[str, Any]:
 
     total = len(normalized)
     video_files = [x for x in normalized if str(x.get("path", "")).lower().endswith(VIDEO_EXTS)]
-    checks.append(CheckResult(
-        ok=(len(video_files) > 0),
-        code="has_video",
-        message=f"Video files detected: {len(video_files)} / {total}" if len(video_files) else "No common video extensions found in torrent file list",
-        meta={"video_count": len(video_files), "total": total}
-    ))
+    checks.append(_check(len(video_files) > 0, "has_video", {"video_count": len(video_files), "total": total}))
 
     # Suspicious / unwanted file types
     suspicious_exts = (".exe", ".bat", ".cmd", ".scr", ".lnk", ".url", ".js", ".vbs", ".ps1", ".apk")
     suspicious = [x["path"] for x in normalized if str(x.get("path","")).lower().endswith(suspicious_exts)]
-    checks.append(CheckResult(
-        ok=(len(suspicious) == 0),
-        code="suspicious_files",
-        message="No suspicious file types detected" if not suspicious else f"Suspicious file types present: {len(suspicious)}",
-        meta={"examples": suspicious[:10]} if suspicious else None
+    checks.append(_check(
+        len(suspicious) == 0,
+        "suspicious_files",
+        {"count": len(suspicious), "examples": suspicious[:10]} if suspicious else None,
     ))
 
     # Sample files (informational)
     sample_hits = [x["path"] for x in normalized if re.search(r"(^|[\\\\/])sample([\\\\/]|$)", str(x.get("path","")), flags=re.IGNORECASE)]
-    checks.append(CheckResult(
-        ok=(len(sample_hits) == 0),
-        code="samples",
-        message="No sample folder/files detected" if not sample_hits else f"Sample folder/files detected: {len(sample_hits)}",
-        meta={"examples": sample_hits[:10]} if sample_hits else None
+    checks.append(_check(
+        len(sample_hits) == 0,
+        "samples",
+        {"count": len(sample_hits), "examples": sample_hits[:10]} if sample_hits else None,
     ))
 
     # Very large file count
     too_many = total >= 300
-    checks.append(CheckResult(
-        ok=not too_many,
-        code="file_count",
-        message=f"File count looks normal ({total})" if not too_many else f"Very large file count ({total}) — possible pack/collection or messy torrent",
-        meta={"total": total}
-    ))
+    checks.append(_check(not too_many, "file_count", {"total": total}))
 
     # Size heuristic (if sizes present)
     sized_videos = [x for x in video_files if isinstance(x.get("size"), int)]
@@ -255,18 +241,9 @@ def analyze_files(file_entries) -> dict[str, Any]:
         largest = max(sized_videos, key=lambda x: x["size"])
         largest_mb = largest["size"] / (1024 * 1024)
         tiny = largest_mb < 200
-        checks.append(CheckResult(
-            ok=not tiny,
-            code="video_size",
-            message=f"Largest video file size OK ({largest_mb:.1f} MB)" if not tiny else f"Largest video file is very small ({largest_mb:.1f} MB) — suspicious",
-            meta={"largest_path": largest["path"], "largest_mb": round(largest_mb, 1)}
-        ))
+        checks.append(_check(not tiny, "video_size", {"largest_path": largest["path"], "largest_mb": round(largest_mb, 1)}))
     else:
-        checks.append(CheckResult(
-            ok=True,
-            code="video_size",
-            message="Video size heuristic skipped (torrent did not provide sizes)",
-        ))
+        checks.append(_check(True, "video_size"))
 
     # Verdict logic
     if not any(c.ok for c in checks if c.code == "has_video"):
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from .settings import settings
 import os
@@ -11,6 +11,13 @@ def _sqlite_url(path: str) -> str:
     return f"sqlite:///{path}"
 
 engine = create_engine(_sqlite_url(settings.db_path), connect_args={"check_same_thread": False})
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _record):
+    # Only takes effect on a new database file; `python -m app.retention --convert` converts existing ones
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cur.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class Base(DeclarativeBase):
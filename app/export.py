@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Iterator
+import argparse
+import csv
+import io
+import json
+import sys
+
+from sqlalchemy import func, select
+
+from .db import SessionLocal
+from .models import Analysis, User
+
+# Exportable columns. verdict/reason/reason_code are pulled out of the results
+# JSON by SQLite itself so rows never have to be decoded in Python.
+EXPORT_COLUMNS = {
+    "id": Analysis.id,
+    "created_at": Analysis.created_at,
+    "created_by": Analysis.created_by,
+    "created_by_username": User.username,
+    "category": Analysis.category,
+    "input_title": Analysis.input_title,
+    "input_description": Analysis.input_description,
+    "torrent_info_name": Analysis.torrent_info_name,
+    "info_hash": Analysis.info_hash,
+    "verdict": func.json_extract(Analysis.results, "$.verdict"),
+    "reason": func.json_extract(Analysis.results, "$.reason"),
+    "reason_code": func.json_extract(Analysis.results, "$.reason_code"),
+    "announce": Analysis.announce,
+    "files": Analysis.files,
+    "results": Analysis.results,
+}
+
+# Stored as json strings: spliced into NDJSON verbatim, written as-is to CSV
+RAW_JSON_COLUMNS = {"announce", "files", "results"}
+
+DEFAULT_COLUMNS = [
+    "id", "created_at", "created_by_username", "category", "input_title",
+    "torrent_info_name", "info_hash", "verdict", "reason", "reason_code",
+]
+
+FORMATS = ("ndjson", "csv")
+
+FETCH_SIZE = 1000  # rows per keyset page (one short read transaction each)
+CSV_FLUSH_ROWS = 500  # rows per yielded csv chunk
+
+
+def parse_columns(raw: str | None) -> list[str]:
+    if not raw:
+        return list(DEFAULT_COLUMNS)
+    cols = [c.strip() for c in raw.split(",") if c.strip()]
+    unknown = [c for c in cols if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    if not cols:
+        raise ValueError("No export columns selected")
+    return cols
+
+
+def parse_when(raw: str | None) -> datetime | None:
+    # Accepts a date ("2026-01-31") or an ISO datetime; stored times are naive UTC
+    if not raw:
+        return None
+    try:
+        dt = datetime.fromisoformat(raw.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date/time: {raw}")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def build_query(
+    columns: list[str],
+    since: datetime | None = None,
+    until: datetime | None = None,
+    verdict: str | None = None,
+    category: str | None = None,
+):
+    # Leading id is the keyset cursor; _iter_rows strips it
+    stmt = select(Analysis.id, *[EXPORT_COLUMNS[c].label(c) for c in columns]).select_from(Analysis)
+    if "created_by_username" in columns:
+        stmt = stmt.outerjoin(User, User.id == Analysis.created_by)
+    if since is not None:
+        stmt = stmt.where(Analysis.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Analysis.created_at < until)
+    if verdict:
+        stmt = stmt.where(EXPORT_COLUMNS["verdict"] == verdict)
+    if category:
+        stmt = stmt.where(Analysis.category == category)
+    return stmt.order_by(Analysis.id.asc())
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z"
+    return value
+
+
+def _iter_rows(stmt) -> Iterator[Any]:
+    # Keyset pages, each in its own short session: no read transaction stays
+    # open while a slow client consumes rows, so writers are never blocked.
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.execute(stmt.where(Analysis.id > last_id).limit(FETCH_SIZE)).all()
+        finally:
+            db.close()
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        last_id = rows[-1][0]
+
+
+def iter_ndjson(stmt, columns: list[str]) -> Iterator[str]:
+    keys = [json.dumps(c) + ":" for c in columns]
+    raw = [c in RAW_JSON_COLUMNS for c in columns]
+    for row in _iter_rows(stmt):
+        parts = []
+        for key, is_raw, value in zip(keys, raw, row):
+            if value is None:
+                parts.append(key + "null")
+            elif is_raw:
+                parts.append(key + value)
+            else:
+                parts.append(key + json.dumps(_scalar(value), ensure_ascii=False))
+        yield "{" + ",".join(parts) + "}\n"
+
+
+def iter_csv(stmt, columns: list[str]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    pending = 0
+    for row in _iter_rows(stmt):
+        writer.writerow(["" if v is None else _scalar(v) for v in row])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
+
+
+def stream_export(
+    fmt: str,
+    columns: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    verdict: str | None = None,
+    category: str | None = None,
+) -> Iterator[str]:
+    """
+    Validate export options and return a lazy row generator.
+    Raises ValueError on bad options (before any row is produced).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format must be one of: {', '.join(FORMATS)}")
+    cols = parse_columns(columns)
+    stmt = build_query(cols, parse_when(since), parse_when(until), verdict, category)
+    if fmt == "csv":
+        return iter_csv(stmt, cols)
+    return iter_ndjson(stmt, cols)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.export", description="Stream analyses as NDJSON or CSV.")
+    p.add_argument("--format", choices=FORMATS, default="ndjson")
+    p.add_argument("--columns", help=f"comma separated; available: {','.join(EXPORT_COLUMNS)}")
+    p.add_argument("--since", help="created_at >= (date or ISO datetime, UTC)")
+    p.add_argument("--until", help="created_at < (date or ISO datetime, UTC)")
+    p.add_argument("--verdict", choices=("pass", "warn", "fail"))
+    p.add_argument("--category", choices=("Movie", "TV"))
+    p.add_argument("--output", "-o", help="output file (default: stdout)")
+    args = p.parse_args(argv)
+
+    try:
+        chunks = stream_export(args.format, args.columns, args.since, args.until, args.verdict, args.category)
+    except ValueError as e:
+        p.error(str(e))
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,282 @@
+"""
+Watch-folder bulk ingester.
+
+Drop .torrent files into a spool directory; each file is claimed by renaming
+it into SPOOL/.processing, parsed and analysed in a process pool, inserted in
+batches, then moved to SPOOL/done (or SPOOL/failed with a .error note).
+Files left in .processing by a crash are picked up again on the next start;
+a file is not inserted twice if this ingester's user already stored its
+info_hash after the file was claimed.
+
+    python -m app.ingest /srv/spool --user ingest-bot [--category auto|Movie|TV]
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import time
+
+from .torrent_meta import TorrentMeta, read_torrent_bytes
+from .pipeline import make_results, effective_title_for, guess_category, build_analysis
+from .serialize import dumps, loads
+
+log = logging.getLogger("qg.ingest")
+
+PROCESSING_DIR = ".processing"
+DONE_DIR = "done"
+FAILED_DIR = "failed"
+SETTLE_SECONDS = 1.0  # skip files modified more recently than this (still being written)
+
+# inotify(7) event masks
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+
+@dataclass
+class IngestResult:
+    name: str
+    ok: bool
+    category: str | None = None
+    meta: TorrentMeta | None = None
+    results: dict[str, Any] | None = None
+    error: str | None = None
+
+
+def analyze_file(path: str, category: str = "auto") -> IngestResult:
+    # Runs in a worker process
+    name = os.path.basename(path)
+    try:
+        with open(path, "rb") as f:
+            meta = read_torrent_bytes(f.read())
+        title = effective_title_for(None, meta)
+        if not title:
+            return IngestResult(name=name, ok=False, error="Torrent has no info name")
+        cat = guess_category(title) if category == "auto" else category
+        # Round-trip to plain JSON types: GuessIt matches don't pickle back to the parent
+        results = loads(dumps(make_results(cat, title, meta, None)))
+        return IngestResult(name=name, ok=True, category=cat, meta=meta, results=results)
+    except Exception as e:
+        return IngestResult(name=name, ok=False, error=f"{type(e).__name__}: {e}")
+
+
+class PollingWatcher:
+    def __init__(self, path: str, interval: float):
+        self.interval = interval
+
+    def wait(self):
+        time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Wakes up on IN_CLOSE_WRITE/IN_MOVED_TO; the spool is rescanned either way."""
+
+    def __init__(self, path: str, interval: float):
+        self.interval = interval
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch failed")
+
+    def wait(self):
+        # The timeout doubles as a periodic rescan (settling files, missed events)
+        readable, _, _ = select.select([self.fd], [], [], self.interval)
+        if readable:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(path: str, interval: float):
+    try:
+        return InotifyWatcher(path, interval)
+    except (OSError, AttributeError) as e:
+        log.info("inotify unavailable (%s), polling every %.1fs", e, interval)
+        return PollingWatcher(path, interval)
+
+
+class Ingester:
+    def __init__(self, spool: str, user_id: int, category: str = "auto", workers: int | None = None,
+                 batch_size: int = 50):
+        self.spool = os.path.abspath(spool)
+        self.user_id = user_id
+        self.category = category
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.processing = os.path.join(self.spool, PROCESSING_DIR)
+        self.done = os.path.join(self.spool, DONE_DIR)
+        self.failed = os.path.join(self.spool, FAILED_DIR)
+        for d in (self.spool, self.processing, self.done, self.failed):
+            os.makedirs(d, exist_ok=True)
+
+    def recover(self) -> list[str]:
+        """Files a previous run claimed but did not finish."""
+        return sorted(
+            os.path.join(self.processing, n) for n in os.listdir(self.processing) if n.endswith(".torrent")
+        )
+
+    def claim(self) -> list[str]:
+        now = time.time()
+        claimed = []
+        entries = []
+        for e in os.scandir(self.spool):
+            if e.is_file() and e.name.endswith(".torrent"):
+                mtime = e.stat().st_mtime
+                if now - mtime >= SETTLE_SECONDS:
+                    entries.append((mtime, e.name))
+        for _, name in sorted(entries):
+            dst = os.path.join(self.processing, name)
+            try:
+                os.rename(os.path.join(self.spool, name), dst)
+            except FileNotFoundError:
+                continue  # claimed by another ingester
+            os.utime(dst)  # mtime in .processing records the claim time for recovery
+            claimed.append(dst)
+        return claimed
+
+    def _move(self, path: str, dest_dir: str):
+        name = os.path.basename(path)
+        dst = os.path.join(dest_dir, name)
+        if os.path.exists(dst):
+            stem, ext = os.path.splitext(name)
+            dst = os.path.join(dest_dir, f"{stem}.{int(time.time() * 1000)}{ext}")
+        os.replace(path, dst)
+        return dst
+
+    def _already_stored(self, db, paths: list[str], results: list[IngestResult]) -> set[str]:
+        """Names of recovered files whose row this ingester committed before the crash."""
+        from .models import Analysis
+
+        claimed_at = {}
+        for path, r in zip(paths, results):
+            if r.ok and r.meta and r.meta.info_hash:
+                claimed_at[r.name] = (r.meta.info_hash, datetime.utcfromtimestamp(os.stat(path).st_mtime))
+        if not claimed_at:
+            return set()
+        rows = (
+            db.query(Analysis.info_hash, Analysis.created_at)
+            .filter(
+                Analysis.created_by == self.user_id,
+                Analysis.info_hash.in_({h for h, _ in claimed_at.values()}),
+                Analysis.created_at >= min(t for _, t in claimed_at.values()),
+            )
+            .all()
+        )
+        stored: dict[str, list[datetime]] = {}
+        for h, created_at in rows:
+            stored.setdefault(h, []).append(created_at)
+        return {
+            name for name, (h, t) in claimed_at.items()
+            if any(created_at >= t for created_at in stored.get(h, ()))
+        }
+
+    def _store(self, paths: list[str], results: list[IngestResult], recovered: bool) -> int:
+        from .db import SessionLocal
+
+        ok = [r for r in results if r.ok]
+        db = SessionLocal()
+        try:
+            if recovered and ok:
+                # A crash may have happened after commit but before the files were moved
+                skip = self._already_stored(db, paths, results)
+                ok = [r for r in ok if r.name not in skip]
+            db.add_all([
+                build_analysis(self.user_id, r.category, None, None, r.meta, r.results) for r in ok
+            ])
+            db.commit()
+        finally:
+            db.close()
+        return len(ok)
+
+    def process(self, pool: ProcessPoolExecutor, paths: list[str], recovered: bool = False) -> int:
+        inserted = 0
+        for i in range(0, len(paths), self.batch_size):
+            batch = paths[i:i + self.batch_size]
+            cats = [self.category] * len(batch)
+            results = list(pool.map(analyze_file, batch, cats))
+            inserted += self._store(batch, results, recovered)
+            for path, r in zip(batch, results):
+                if r.ok:
+                    self._move(path, self.done)
+                else:
+                    dst = self._move(path, self.failed)
+                    with open(dst + ".error", "w", encoding="utf-8") as f:
+                        f.write((r.error or "unknown error") + "\n")
+                    log.warning("failed %s: %s", r.name, r.error)
+            log.info("ingested %d/%d files", inserted, i + len(batch))
+        return inserted
+
+    def run(self, once: bool = False, poll_interval: float = 5.0):
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = self.recover()
+            if pending:
+                log.info("resuming %d files from %s", len(pending), self.processing)
+                self.process(pool, pending, recovered=True)
+            if once:
+                self.process(pool, self.claim())
+                return
+            watcher = make_watcher(self.spool, poll_interval)
+            try:
+                while True:
+                    paths = self.claim()
+                    if paths:
+                        self.process(pool, paths)
+                    else:
+                        watcher.wait()
+            finally:
+                watcher.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.ingest", description="Ingest .torrent files from a spool directory.")
+    p.add_argument("spool", help="directory to watch for .torrent files")
+    p.add_argument("--user", required=True, help="username the analyses are recorded under")
+    p.add_argument("--category", choices=("auto", "Movie", "TV"), default="auto")
+    p.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    p.add_argument("--batch", type=int, default=50, help="rows per insert transaction")
+    p.add_argument("--poll", type=float, default=5.0, help="rescan interval in seconds")
+    p.add_argument("--once", action="store_true", help="process what is in the spool and exit")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    from .db import Base, SessionLocal, engine
+    from .models import User
+    from .search import ensure_search_index
+    from . import webhooks  # noqa: F401  (registers the outbox enqueue hook)
+
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.user).first()
+    finally:
+        db.close()
+    if not user:
+        p.error(f"Unknown user: {args.user}")
+
+    Ingester(args.spool, user.id, args.category, args.workers, args.batch).run(once=args.once, poll_interval=args.poll)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
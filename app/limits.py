@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+
+from fastapi import Depends, HTTPException
+
+from .auth import get_current_user
+from .models import User
+from .settings import settings
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, capacity: int):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class AdmissionController:
+    """
+    Bounds analysis work: a global in-flight cap (sheds load before workers
+    saturate), plus per-user in-flight caps and token-bucket rate limits.
+    A limit of 0 disables it.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_inflight_per_user: int, max_inflight_total: int):
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1, burst)
+        self.max_inflight_per_user = max_inflight_per_user
+        self.max_inflight_total = max_inflight_total
+        self._lock = threading.Lock()
+        self._buckets: dict[int, TokenBucket] = {}
+        self._inflight: dict[int, int] = {}
+        self._total = 0
+
+    def _reject(self, detail: str, retry_after: float):
+        raise HTTPException(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def acquire(self, user_id: int):
+        with self._lock:
+            if self.max_inflight_total and self._total >= self.max_inflight_total:
+                self._reject("Server busy - too many analyses in progress", 1)
+
+            inflight = self._inflight.get(user_id, 0)
+            if self.max_inflight_per_user and inflight >= self.max_inflight_per_user:
+                self._reject("Too many concurrent analyses for this user", 1)
+
+            bucket = None
+            if self.rate_per_minute > 0:
+                bucket = self._buckets.get(user_id)
+                if bucket is None:
+                    bucket = TokenBucket(self.rate_per_minute / 60.0, self.burst)
+                    self._buckets[user_id] = bucket
+                wait = bucket.retry_after()
+                if wait > 0:
+                    self._reject("Rate limit exceeded", wait)
+                bucket.take()
+
+            self._inflight[user_id] = inflight + 1
+            self._total += 1
+
+    def release(self, user_id: int):
+        with self._lock:
+            left = self._inflight.get(user_id, 0) - 1
+            if left > 0:
+                self._inflight[user_id] = left
+            else:
+                self._inflight.pop(user_id, None)
+            self._total = max(0, self._total - 1)
+
+
+admission = AdmissionController(
+    rate_per_minute=settings.rate_limit_per_minute,
+    burst=settings.rate_limit_burst,
+    max_inflight_per_user=settings.max_inflight_per_user,
+    max_inflight_total=settings.max_inflight_total,
+)
+
+
+def admit_analysis(user: User = Depends(get_current_user)):
+    # Use instead of get_current_user on endpoints that run an analysis
+    admission.acquire(user.id)
+    try:
+        yield user
+    finally:
+        admission.release(user.id)
+
+
+def admit_analysis_form(user: User = Depends(get_current_user)):
+    # HTML form variant: yields the 429 (or None) so the page can re-render with an error
+    try:
+        admission.acquire(user.id)
+    except HTTPException as e:
+        yield e
+        return
+    try:
+        yield None
+    finally:
+        admission.release(user.id)
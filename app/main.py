@@ -1,26 +1,37 @@
 from fastapi import FastAPI, Request, Form, UploadFile, File, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from datetime import datetime
-import json
 
 from .db import engine
-from .models import User, Analysis
+from .models import User, Analysis, WebhookSubscription, WebhookOutbox
 from .auth import get_db, verify_password, hash_password, create_token, set_auth_cookie, clear_auth_cookie, get_current_user, require_admin
 from .settings import settings
 from .torrent_meta import read_torrent_bytes
-from .checks import analyze_title, analyze_files
-from .guessit_wrap import guess
+from .pipeline import make_results, effective_title_for, build_analysis
+from .export import stream_export
+from .limits import admit_analysis, admit_analysis_form
+from .profiling import profiler, profiled, ProfiledRoute, ProfilingMiddleware
+from .serialize import loads, decode_results, api_response
+from .search import ensure_search_index, search_analyses
+from .singleflight import analyses_flight, analysis_key
+from .webhooks import run_dispatcher
+from .retention import load_archived, run_scheduler as run_retention_scheduler
+import asyncio
+import secrets
 
 app = FastAPI(title="Quality Gateway")
+app.router.route_class = ProfiledRoute
 templates = Jinja2Templates(directory="app/templates")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.add_middleware(ProfilingMiddleware)
 
 def ensure_schema_and_admin(db: Session):
     from .db import Base
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
 
     # If no users exist, create initial admin from env vars (if provided)
     if db.query(User).count() == 0:
@@ -48,6 +59,21 @@ def _startup():
     finally:
         db.close()
 
+_background: list[asyncio.Task] = []
+
+@app.on_event("startup")
+async def _start_webhook_dispatcher():
+    _background.append(asyncio.create_task(run_dispatcher()))
+
+@app.on_event("startup")
+async def _start_retention_scheduler():
+    _background.append(asyncio.create_task(run_retention_scheduler()))
+
+@app.on_event("shutdown")
+async def _stop_background():
+    for t in _background:
+        t.cancel()
+
 def _analysis_to_dict(a: Analysis) -> dict:
     return {
         "id": a.id,
@@ -59,99 +85,11 @@ def _analysis_to_dict(a: Analysis) -> dict:
         "input_description": a.input_description,
         "torrent_info_name": a.torrent_info_name,
         "info_hash": a.info_hash,
-        "announce": json.loads(a.announce) if a.announce else [],
-        "files": json.loads(a.files) if a.files else [],
-        "results": json.loads(a.results),
-    }
-
-def _pick_reason_from_checks(title_res: dict) -> tuple[str | None, str | None]:
-    """
-    Returns (reason_string, reason_code) for moderation.
-    reason_string is a short staff-facing string; reason_code helps debugging.
-    """
-    checks = title_res.get("checks") or []
-    failed = [c for c in checks if not c.get("ok")]
-
-    if not failed:
-        return (None, None)
-
-    # Prefer porn_block if it failed
-    porn = next((c for c in failed if c.get("code") == "porn_block"), None)
-    if porn:
-        return ("No Porn here", "porn_block")
-
-    first = failed[0]
-    code = first.get("code")
-
-    mapping = {
-        "dot_style": "Naming wrong - use dots, no spaces/parentheses",
-        "group_suffix": "Naming wrong - missing -GROUP suffix",
-        "pattern_movie": "Naming wrong - Movie pattern required (Title.Year.Res.Source-Group)",
-        "pattern_tv": "Naming wrong - TV pattern required (Show.SxxEyy...-Group or Show.Sxx...-Group)",
-        "pattern_tv_ep": "Naming wrong - TV episode pattern required (Show.SxxEyy...-Group)",
-        "pattern_tv_season": "Naming wrong - TV season pattern required (Show.Sxx...-Group)",
-        "banned_quality": "Banned quality - no TS/SCREEN/CAM etc",
-        "min_resolution": "Resolution too low (min 760p)",
+        "announce": loads(a.announce) if a.announce else [],
+        "files": loads(a.files) if a.files else [],
+        "results": decode_results(a.results),
     }
 
-    return (mapping.get(code, "Naming wrong - check your naming"), code)
-
-
-def _make_results(category: str, title: str, torrent_meta, description: str | None):
-    title_res = analyze_title(category, title, settings.min_res_p, settings.enable_porn_block)
-    files_res = analyze_files(torrent_meta.files if torrent_meta else [])
-    gi_title = guess(title)
-    gi_info = guess(torrent_meta.info_name or "") if torrent_meta and torrent_meta.info_name else {}
-    gi_files = []
-    for f in (torrent_meta.files[:10] if torrent_meta else []):  # cap for UI
-        # f can be a legacy string path OR a dict {"path": "...", "size": ...}
-        if isinstance(f, dict):
-            p = str(f.get("path", ""))
-            size = f.get("size")
-        else:
-            p = str(f)
-            size = None
-        basename = p.split("/")[-1].split("\\")[-1]
-        gi_files.append({"path": p, "size": size, "guessit": guess(basename)})
-
-
-    
-    # Decide overall verdict and reason:
-    # - If title checks fail: FAIL with reason (porn or naming)
-    # - Else if file checks warn: WARN (no reason)
-    # - Else: PASS (no reason)
-    reason = None
-    reason_code = None
-
-    if title_res.get("verdict") == "fail":
-        reason, reason_code = _pick_reason_from_checks(title_res)
-        verdict = "fail"
-    elif files_res.get("verdict") == "fail":
-        verdict = "fail"
-    elif files_res.get("verdict") == "warn":
-        verdict = "warn"
-    else:
-        verdict = "pass"
-
-
-    return {
-        "verdict": verdict,
-        "reason": reason,
-        "reason_code": reason_code,
-        "policy": {
-            "min_res_p": settings.min_res_p,
-            "enable_porn_block": settings.enable_porn_block,
-        },
-        "title_checks": title_res,
-        "file_checks": files_res,
-        "guessit": {
-            "title": gi_title,
-            "torrent_info_name": gi_info,
-            "sample_files": gi_files,
-        }
-    }
-
-
 # ---------- Web UI ----------
 @app.get("/login", response_class=HTMLResponse)
 def login_page(request: Request):
@@ -175,19 +113,24 @@ def logout():
     return resp
 
 @app.get("/", response_class=HTMLResponse)
-def dashboard(request: Request, db: Session = Depends(get_db)):
+def dashboard(request: Request, q: str | None = None, page: int = 1, db: Session = Depends(get_db)):
     # IMPORTANT: don't use Depends(get_current_user) here
     try:
         user = get_current_user(request, db)
     except Exception:
         return RedirectResponse(url="/login", status_code=302)
 
+    if q and q.strip():
+        found = search_analyses(db, q, page=page)
+        items = [{"a": row, "verdict": row.verdict, "by": row.created_by_username} for row in found["items"]]
+        return templates.TemplateResponse("dashboard.html", {"request": request, "user": user, "items": items, "search": found})
+
     analyses = db.query(Analysis).order_by(Analysis.id.desc()).limit(50).all()
 
     items = []
     for a in analyses:
         try:
-            r = json.loads(a.results) if a.results else {}
+            r = loads(a.results) if a.results else {}
             v = r.get("verdict")
         except Exception:
             v = None
@@ -208,8 +151,17 @@ async def new_analysis(
     description: str | None = Form(None),
     torrent_file: UploadFile | None = File(None),
     user: User = Depends(get_current_user),
+    rejected: HTTPException | None = Depends(admit_analysis_form),
     db: Session = Depends(get_db),
 ):
+    if rejected:
+        return templates.TemplateResponse(
+            "new_analysis.html",
+            {"request": request, "user": user, "error": rejected.detail},
+            status_code=rejected.status_code,
+            headers=rejected.headers,
+        )
+
     if category not in ("Movie", "TV"):
         raise HTTPException(400, "Category must be Movie or TV")
     
@@ -230,32 +182,15 @@ async def new_analysis(
         raw = await torrent_file.read()
         meta = read_torrent_bytes(raw)
 
-    effective_title = (title or (meta.info_name if meta else "") or "").strip()
-    import re
-
-    # If title was not pasted, we typically use the torrent's info name.
-    # That can include a container extension (e.g. "...-GROUP.mkv") which breaks pattern/group checks.
-    if meta and (not title):
-        effective_title = re.sub(r"\.(mkv|mp4|avi|m2ts|ts|mov|wmv)$", "", effective_title, flags=re.IGNORECASE)
-
-    # Also strip accidental ".torrent" if someone pastes/uses a filename
-    effective_title = re.sub(r"\.torrent$", "", effective_title, flags=re.IGNORECASE)
+    effective_title = effective_title_for(title, meta)
     if not effective_title:
         raise HTTPException(400, "Provide a title or upload a torrent with an info name")
 
-    results = _make_results(category, effective_title, meta, description)
-
-    a = Analysis(
-        created_by=user.id,
-        category=category,
-        input_title=title,
-        input_description=description,
-        torrent_info_name=(meta.info_name if meta else None),
-        info_hash=(meta.info_hash if meta else None),
-        announce=json.dumps(meta.announce if meta else []),
-        files=json.dumps(meta.files if meta else []),
-        results=json.dumps(results),
-    )
+    # Identical uploads arriving together share one pipeline run; each still gets its own row
+    key = analysis_key(category, effective_title, meta.info_hash if meta else None)
+    results = await analyses_flight.do(key, profiled(make_results), category, effective_title, meta, description)
+
+    a = build_analysis(user.id, category, title, description, meta, results)
     db.add(a)
     db.commit()
     db.refresh(a)
@@ -267,7 +202,7 @@ def analysis_detail(analysis_id: int, request: Request, user: User = Depends(get
     a = db.get(Analysis, analysis_id)
     if not a:
         raise HTTPException(404, "Not found")
-    results = json.loads(a.results)
+    results = decode_results(a.results)
     return templates.TemplateResponse("analysis_detail.html", {"request": request, "user": user, "a": a, "results": results})
 
 # ---------- Admin: user management ----------
@@ -291,14 +226,106 @@ def create_user(
     db.commit()
     return RedirectResponse(url="/admin/users", status_code=302)
 
+# ---------- Admin: profiling ----------
+@app.post("/admin/profile")
+def start_profile(
+    route: str,
+    requests: int | None = None,
+    seconds: float = 30,
+    interval_ms: float = 5,
+    top: int = 25,
+    admin: User = Depends(require_admin),
+):
+    if not route.startswith("/"):
+        raise HTTPException(400, "route must be a path prefix like /api/analyses")
+    try:
+        session = profiler.start(route, max_requests=requests, seconds=seconds, interval_ms=interval_ms, top_n=top)
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    return session.to_dict(include_results=False)
+
+@app.get("/admin/profile")
+def get_profile(format: str = "json", admin: User = Depends(require_admin)):
+    session = profiler.session or profiler.last
+    if not session:
+        raise HTTPException(404, "No profiling session")
+    if format == "collapsed":
+        return PlainTextResponse(session.collapsed())
+    return session.to_dict(include_results=session is profiler.last)
+
+@app.delete("/admin/profile")
+def stop_profile(admin: User = Depends(require_admin)):
+    session = profiler.stop()
+    if not session:
+        raise HTTPException(404, "No profiling session")
+    return session.to_dict()
+
+# ---------- Admin: webhooks ----------
+def _webhook_to_dict(w: WebhookSubscription, db: Session) -> dict:
+    pending = db.query(WebhookOutbox).filter(WebhookOutbox.subscription_id == w.id, WebhookOutbox.delivered_at.is_(None))
+    return {
+        "id": w.id,
+        "url": w.url,
+        "active": w.active,
+        "created_at": w.created_at.isoformat() + "Z",
+        "pending": pending.filter(WebhookOutbox.attempts < settings.webhook_max_attempts).count(),
+        "failed": pending.filter(WebhookOutbox.attempts >= settings.webhook_max_attempts).count(),
+    }
+
+@app.get("/api/webhooks")
+def api_list_webhooks(admin: User = Depends(require_admin), db: Session = Depends(get_db)):
+    return [_webhook_to_dict(w, db) for w in db.query(WebhookSubscription).order_by(WebhookSubscription.id.asc())]
+
+@app.post("/api/webhooks")
+def api_create_webhook(
+    url: str = Form(...),
+    secret: str | None = Form(None),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    if not url.startswith(("http://", "https://")):
+        raise HTTPException(400, "url must be http(s)")
+    w = WebhookSubscription(url=url, secret=secret or secrets.token_hex(32), active=True, created_by=admin.id)
+    db.add(w)
+    db.commit()
+    db.refresh(w)
+    # The secret is only returned here
+    return {**_webhook_to_dict(w, db), "secret": w.secret}
+
+@app.patch("/api/webhooks/{webhook_id}")
+def api_update_webhook(
+    webhook_id: int,
+    active: bool = Form(...),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    w = db.get(WebhookSubscription, webhook_id)
+    if not w:
+        raise HTTPException(404, "Not found")
+    w.active = active
+    db.commit()
+    db.refresh(w)
+    return _webhook_to_dict(w, db)
+
+@app.delete("/api/webhooks/{webhook_id}")
+def api_delete_webhook(webhook_id: int, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
+    w = db.get(WebhookSubscription, webhook_id)
+    if not w:
+        raise HTTPException(404, "Not found")
+    db.query(WebhookOutbox).filter(WebhookOutbox.subscription_id == w.id).delete()
+    db.delete(w)
+    db.commit()
+    return {"deleted": webhook_id}
+
 # ---------- JSON API ----------
 @app.post("/api/analyses")
 async def api_create_analysis(
+    request: Request,
     category: str = Form(...),
     title: str | None = Form(None),
     description: str | None = Form(None),
     torrent_file: UploadFile | None = File(None),
-    user: User = Depends(get_current_user),
+    user: User = Depends(admit_analysis),
     db: Session = Depends(get_db),
 ):
     if category not in ("Movie", "TV"):
@@ -317,33 +344,64 @@ async def api_create_analysis(
     if not effective_title:
         raise HTTPException(400, "Provide a title or upload a torrent with an info name")
 
-    results = _make_results(category, effective_title, meta, description)
-
-    a = Analysis(
-        created_by=user.id,
-        category=category,
-        input_title=title,
-        input_description=description,
-        torrent_info_name=(meta.info_name if meta else None),
-        info_hash=(meta.info_hash if meta else None),
-        announce=json.dumps(meta.announce if meta else []),
-        files=json.dumps(meta.files if meta else []),
-        results=json.dumps(results),
-    )
+    # Identical uploads arriving together share one pipeline run; each still gets its own row
+    key = analysis_key(category, effective_title, meta.info_hash if meta else None)
+    results = await analyses_flight.do(key, profiled(make_results), category, effective_title, meta, description)
+
+    a = build_analysis(user.id, category, title, description, meta, results)
     db.add(a)
     db.commit()
     db.refresh(a)
 
-    return JSONResponse(_analysis_to_dict(a))
+    return api_response(request, _analysis_to_dict(a))
 
 @app.get("/api/analyses")
-def api_list_analyses(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def api_list_analyses(request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     analyses = db.query(Analysis).order_by(Analysis.id.desc()).limit(200).all()
-    return [_analysis_to_dict(a) for a in analyses]
+    return api_response(request, [_analysis_to_dict(a) for a in analyses])
+
+@app.get("/api/analyses/export")
+def api_export_analyses(
+    format: str = "ndjson",
+    columns: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    verdict: str | None = None,
+    category: str | None = None,
+    user: User = Depends(get_current_user),
+):
+    try:
+        chunks = stream_export(format, columns, since, until, verdict, category)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"analyses.{format}"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/api/search")
+def api_search(request: Request, q: str, page: int = 1, per_page: int = 20, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    found = search_analyses(db, q, page=page, per_page=per_page)
+    found["items"] = [
+        {
+            "id": row.id,
+            "created_at": str(row.created_at).replace(" ", "T") + "Z",
+            "created_by_username": row.created_by_username,
+            "category": row.category,
+            "input_title": row.input_title,
+            "torrent_info_name": row.torrent_info_name,
+            "info_hash": row.info_hash,
+            "verdict": row.verdict,
+        }
+        for row in found["items"]
+    ]
+    return api_response(request, found)
 
 @app.get("/api/analyses/{analysis_id}")
-def api_get_analysis(analysis_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def api_get_analysis(analysis_id: int, request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     a = db.get(Analysis, analysis_id)
     if not a:
-        raise HTTPException(404, "Not found")
-    return _analysis_to_dict(a)
+        archived = load_archived(analysis_id)
+        if not archived:
+            raise HTTPException(404, "Not found")
+        return api_response(request, archived)
+    return api_response(request, _analysis_to_dict(a))
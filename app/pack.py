@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+import re
+
+from .checks import CheckResult, VIDEO_EXTS, _check
+from .guessit_wrap import guess
+
+# Fast pre-pass; GuessIt is only asked about names these don't cover
+EPISODE_REGEX = re.compile(
+    r"(?<![A-Za-z0-9])S(?P<season>\d{1,2})[ ._-]?E(?P<ep>\d{1,4})(?!\d)(?:(?P<sep>[-_.]?)E(?P<ep2>\d{1,4})(?!\d))?",
+    re.IGNORECASE,
+)
+CROSS_REGEX = re.compile(r"(?<![A-Za-z0-9])(?P<season>\d{1,2})x(?P<ep>\d{2,3})(?!\d)", re.IGNORECASE)  # 1x01
+RES_REGEX = re.compile(r"(?<![A-Za-z0-9])(\d{3,4})[pi](?![A-Za-z0-9])", re.IGNORECASE)
+GROUP_REGEX = re.compile(r"-(?!E\d+$)([A-Za-z0-9]{2,})$", re.IGNORECASE)
+SAMPLE_REGEX = re.compile(r"(^|[\\/])sample([\\/.]|$)", re.IGNORECASE)
+
+MAX_LISTED = 50  # cap episode lists kept in meta
+MAX_GUESSIT_FALLBACKS = 20  # per pack; GuessIt costs ~15ms a name, names past this are left unparsed
+
+# Parsed name: (season, episodes, resolution, group)
+Parsed = tuple[int | None, list[int], str | None, str | None]
+
+
+def _normalize(stem: str) -> str:
+    return re.sub(r"[\s._\-]+", ".", stem.lower()).strip(".")
+
+
+def _parse_regex(stem: str) -> Parsed | None:
+    m = EPISODE_REGEX.search(stem) or CROSS_REGEX.search(stem)
+    if not m:
+        return None
+    ep = int(m.group("ep"))
+    episodes = [ep]
+    if m.re is EPISODE_REGEX and m.group("ep2"):
+        ep2 = int(m.group("ep2"))
+        # S01E01-E03 is a range, S01E01E02 lists episodes
+        episodes = list(range(ep, ep2 + 1)) if m.group("sep") == "-" and ep2 > ep else sorted({ep, ep2})
+    r = RES_REGEX.search(stem)
+    g = GROUP_REGEX.search(stem)
+    return (int(m.group("season")), episodes, (r.group(1) + "p") if r else None, g.group(1) if g else None)
+
+
+def _parse_guessit(basename: str, guess_fn: Callable[[str], dict[str, Any]]) -> Parsed:
+    gi = guess_fn(basename) or {}
+    season = gi.get("season")
+    if isinstance(season, list):
+        season = season[0] if season else None
+    ep = gi.get("episode")
+    episodes = [int(e) for e in ep] if isinstance(ep, list) else ([int(ep)] if isinstance(ep, int) else [])
+    res = gi.get("screen_size")
+    group = gi.get("release_group")
+    return (
+        int(season) if isinstance(season, int) else None,
+        episodes,
+        str(res) if res else None,
+        str(group) if group else None,
+    )
+
+
+def _label(season: int | None, ep: int) -> str:
+    return f"S{season or 0:02d}E{ep:02d}"
+
+
+def analyze_pack(file_entries, guess_fn: Callable[[str], dict[str, Any]] = guess) -> dict[str, Any] | None:
+    """
+    Consistency checks across every video file of a season pack.
+    Returns None when the torrent holds fewer than two episode files.
+    """
+    cache: dict[str, Parsed] = {}
+    parsed: list[Parsed] = []
+    fallbacks = 0
+    unparsed = 0
+    for e in file_entries or []:
+        path = str(e.get("path", "")) if isinstance(e, dict) else str(e)
+        if not path.lower().endswith(VIDEO_EXTS) or SAMPLE_REGEX.search(path):
+            continue
+        basename = path.split("/")[-1].split("\\")[-1]
+        stem = basename.rsplit(".", 1)[0]
+        key = _normalize(stem)
+        p = cache.get(key)
+        if p is None:
+            p = _parse_regex(stem)
+            if p is None:
+                if fallbacks >= MAX_GUESSIT_FALLBACKS:
+                    unparsed += 1
+                    continue
+                fallbacks += 1
+                p = _parse_guessit(basename, guess_fn)
+            cache[key] = p
+        if p[1]:
+            parsed.append(p)
+
+    if len(parsed) < 2:
+        return None
+
+    seen: dict[tuple[int | None, int], int] = {}
+    for season, episodes, _, _ in parsed:
+        for ep in episodes:
+            seen[(season, ep)] = seen.get((season, ep), 0) + 1
+
+    by_season: dict[int | None, set[int]] = {}
+    for season, ep in seen:
+        by_season.setdefault(season, set()).add(ep)
+    # Gaps are counted from the first episode present, so split-season packs
+    # (S02E13-E24) pass; a season not starting at E01 is only reported.
+    seasons = sorted(by_season, key=lambda s: s or 0)
+    missing = [
+        _label(season, ep)
+        for season in seasons
+        for ep in range(min(by_season[season]), max(by_season[season]) + 1)
+        if ep not in by_season[season]
+    ]
+    partial = [_label(season, min(by_season[season])) for season in seasons if min(by_season[season]) > 1]
+    duplicates = [_label(s, ep) for (s, ep), n in sorted(seen.items(), key=lambda x: (x[0][0] or 0, x[0][1])) if n > 1]
+    resolutions = sorted({p[2] for p in parsed if p[2]}, key=lambda r: int(re.sub(r"\D", "", r) or 0), reverse=True)
+    groups = sorted({p[3] for p in parsed if p[3]}, key=str.lower)
+
+    checks: list[CheckResult] = [
+        _check(not missing, "missing_episodes", {"count": len(missing), "episodes": missing[:MAX_LISTED]} if missing else {"episodes_found": len(seen)}),
+        _check(not duplicates, "duplicate_episodes", {"count": len(duplicates), "episodes": duplicates[:MAX_LISTED]} if duplicates else None),
+        _check(len(resolutions) <= 1, "mixed_resolution", {"count": len(resolutions), "resolutions": resolutions} if resolutions else None),
+        _check(len(groups) <= 1, "mixed_group", {"count": len(groups), "groups": groups} if groups else None),
+    ]
+    if partial:
+        checks.append(_check(True, "partial_season", {"starts_at": ", ".join(partial[:MAX_LISTED])}))
+    verdict = "pass" if all(c.ok for c in checks) else "warn"
+    return {
+        "verdict": verdict,
+        "checks": [c.__dict__ for c in checks],
+        "episode_files": len(parsed),
+        "unparsed_files": unparsed,
+    }
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import Any
+import re
+
+from .checks import analyze_title, analyze_files
+from .guessit_wrap import guess
+from .models import Analysis
+from .pack import analyze_pack
+from .serialize import dumps, encode_results
+from .settings import settings
+from .torrent_meta import TorrentMeta
+
+TV_MARKER = re.compile(r"(?:^|[.\s_-])S\d{2}(?:E\d{2,3})?(?:[.\s_-]|$)", re.IGNORECASE)
+
+
+def pick_reason_from_checks(title_res: dict) -> tuple[str | None, str | None]:
+    """
+    Returns (reason_string, reason_code) for moderation.
+    reason_string is a short staff-facing string; reason_code helps debugging.
+    """
+    checks = title_res.get("checks") or []
+    failed = [c for c in checks if not c.get("ok")]
+
+    if not failed:
+        return (None, None)
+
+    # Prefer porn_block if it failed
+    porn = next((c for c in failed if c.get("code") == "porn_block"), None)
+    if porn:
+        return ("No Porn here", "porn_block")
+
+    first = failed[0]
+    code = first.get("code")
+
+    mapping = {
+        "dot_style": "Naming wrong - use dots, no spaces/parentheses",
+        "group_suffix": "Naming wrong - missing -GROUP suffix",
+        "pattern_movie": "Naming wrong - Movie pattern required (Title.Year.Res.Source-Group)",
+        "pattern_tv": "Naming wrong - TV pattern required (Show.SxxEyy...-Group or Show.Sxx...-Group)",
+        "pattern_tv_ep": "Naming wrong - TV episode pattern required (Show.SxxEyy...-Group)",
+        "pattern_tv_season": "Naming wrong - TV season pattern required (Show.Sxx...-Group)",
+        "banned_quality": "Banned quality - no TS/SCREEN/CAM etc",
+        "min_resolution": "Resolution too low (min 760p)",
+    }
+
+    return (mapping.get(code, "Naming wrong - check your naming"), code)
+
+
+def make_results(category: str, title: str, torrent_meta, description: str | None):
+    title_res = analyze_title(category, title, settings.min_res_p, settings.enable_porn_block)
+    files_res = analyze_files(torrent_meta.files if torrent_meta else [])
+    # Season packs: every episode file, not just the UI sample below
+    pack_res = analyze_pack(torrent_meta.files, guess) if (category == "TV" and torrent_meta) else None
+    gi_title = guess(title)
+    gi_info = guess(torrent_meta.info_name or "") if torrent_meta and torrent_meta.info_name else {}
+    gi_files = []
+    for f in (torrent_meta.files[:10] if torrent_meta else []):  # cap for UI
+        # f can be a legacy string path OR a dict {"path": "...", "size": ...}
+        if isinstance(f, dict):
+            p = str(f.get("path", ""))
+            size = f.get("size")
+        else:
+            p = str(f)
+            size = None
+        basename = p.split("/")[-1].split("\\")[-1]
+        gi_files.append({"path": p, "size": size, "guessit": guess(basename)})
+
+
+    
+    # Decide overall verdict and reason:
+    # - If title checks fail: FAIL with reason (porn or naming)
+    # - Else if file or pack checks warn: WARN (no reason)
+    # - Else: PASS (no reason)
+    reason = None
+    reason_code = None
+
+    if title_res.get("verdict") == "fail":
+        reason, reason_code = pick_reason_from_checks(title_res)
+        verdict = "fail"
+    elif files_res.get("verdict") == "fail":
+        verdict = "fail"
+    elif files_res.get("verdict") == "warn" or (pack_res and pack_res.get("verdict") == "warn"):
+        verdict = "warn"
+    else:
+        verdict = "pass"
+
+
+    return {
+        "verdict": verdict,
+        "reason": reason,
+        "reason_code": reason_code,
+        "policy": {
+            "min_res_p": settings.min_res_p,
+            "enable_porn_block": settings.enable_porn_block,
+        },
+        "title_checks": title_res,
+        "file_checks": files_res,
+        "pack_checks": pack_res,
+        "guessit": {
+            "title": gi_title,
+            "torrent_info_name": gi_info,
+            "sample_files": gi_files,
+        }
+    }
+
+
+def effective_title_for(title: str | None, meta: TorrentMeta | None) -> str:
+    effective_title = (title or (meta.info_name if meta else "") or "").strip()
+
+    # If title was not pasted, we typically use the torrent's info name.
+    # That can include a container extension (e.g. "...-GROUP.mkv") which breaks pattern/group checks.
+    if meta and (not title):
+        effective_title = re.sub(r"\.(mkv|mp4|avi|m2ts|ts|mov|wmv)$", "", effective_title, flags=re.IGNORECASE)
+
+    # Also strip accidental ".torrent" if someone pastes/uses a filename
+    return re.sub(r"\.torrent$", "", effective_title, flags=re.IGNORECASE)
+
+
+def guess_category(title: str) -> str:
+    # Season/episode marker means TV; everything else is treated as a Movie
+    return "TV" if TV_MARKER.search(title) else "Movie"
+
+
+def build_analysis(
+    user_id: int,
+    category: str,
+    title: str | None,
+    description: str | None,
+    meta: TorrentMeta | None,
+    results: dict[str, Any],
+) -> Analysis:
+    return Analysis(
+        created_by=user_id,
+        category=category,
+        input_title=title,
+        input_description=description,
+        torrent_info_name=(meta.info_name if meta else None),
+        info_hash=(meta.info_hash if meta else None),
+        announce=dumps(meta.announce if meta else []),
+        files=dumps(meta.files if meta else []),
+        results=encode_results(results),
+    )
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from fastapi.routing import APIRoute
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MAX_SECONDS = 600
+MAX_DEPTH = 128
+
+# Session of the admitted request being served in this context; anyio copies
+# it into worker threads along with the rest of the context.
+_current: ContextVar["ProfileSession | None"] = ContextVar("qg_profile_session", default=None)
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(APP_DIR):
+        short = "app/" + os.path.relpath(path, APP_DIR)
+    else:
+        short = "/".join(path.replace("\\", "/").split("/")[-2:])
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """
+    One sampling run: profiles requests whose path starts with `route` until
+    `max_requests` matching requests have completed or `seconds` elapsed.
+    """
+
+    def __init__(self, route: str, max_requests: int | None, seconds: float, interval_ms: float, top_n: int):
+        self.route = route
+        self.max_requests = max_requests
+        self.seconds = seconds
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.top_n = top_n
+
+        self.started_at = time.time()
+        self.deadline = time.monotonic() + seconds
+        self.finished_at: float | None = None
+
+        self._lock = threading.Lock()
+        self._finish_lock = threading.Lock()
+        self.closing = False
+        self.admitted = 0
+        self.completed = 0
+        self.inflight = 0
+        self.samples = 0
+        # What is sampled: worker threads running admitted work (ident -> depth)
+        # and the middleware frames of admitted requests on the event loop.
+        self.threads: Counter[int] = Counter()
+        self.frames: dict[int, Any] = {}
+        self.stacks: Counter[str] = Counter()
+        self.allocations: list[dict[str, Any]] = []
+        self._owns_tracemalloc = False
+
+    # --- request accounting (called from the middleware) ---
+    def matches(self, path: str) -> bool:
+        return path.startswith(self.route)
+
+    def begin_request(self, frame) -> bool:
+        with self._lock:
+            if self.closing:
+                return False
+            if self.max_requests is not None and self.admitted >= self.max_requests:
+                return False
+            self.admitted += 1
+            self.inflight += 1
+            self.frames[id(frame)] = frame
+            return True
+
+    def end_request(self, frame):
+        with self._lock:
+            self.inflight -= 1
+            self.completed += 1
+            self.frames.pop(id(frame), None)
+
+    def enter_thread(self):
+        with self._lock:
+            self.threads[threading.get_ident()] += 1
+
+    def exit_thread(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] -= 1
+            if self.threads[ident] <= 0:
+                del self.threads[ident]
+
+    def is_done(self) -> bool:
+        if time.monotonic() >= self.deadline:
+            return True
+        with self._lock:
+            return self.max_requests is not None and self.completed >= self.max_requests and self.inflight == 0
+
+    # --- sampling ---
+    def sample(self, own_ident: int):
+        if self.inflight <= 0:
+            return
+        with self._lock:
+            threads = set(self.threads)
+            frames = set(self.frames)
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            # Worker threads are tagged while they run admitted work; the event
+            # loop only counts while it is inside an admitted request's task.
+            ours = ident in threads
+            labels = []
+            f = frame
+            while f is not None:
+                if id(f) in frames:
+                    ours = True
+                if len(labels) < MAX_DEPTH:
+                    labels.append(_frame_label(f.f_code))
+                elif ours:
+                    break
+                f = f.f_back
+            if ours:
+                labels.reverse()
+                self.stacks[";".join(labels)] += 1
+                self.samples += 1
+
+    def start_tracemalloc(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+
+    def finish(self):
+        self.closing = True
+        with self._finish_lock:
+            if self.finished_at is None:
+                self._snapshot_allocations()
+                self.finished_at = time.time()
+
+    def _snapshot_allocations(self):
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ))
+            for stat in snapshot.statistics("lineno")[: self.top_n]:
+                frame = stat.traceback[0]
+                self.allocations.append({
+                    "location": f"{frame.filename}:{frame.lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                })
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+    # --- output ---
+    def collapsed(self) -> str:
+        # Brendan Gregg's collapsed format: "frame;frame;frame count"
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def to_dict(self, include_results: bool = True) -> dict[str, Any]:
+        d: dict[str, Any] = {
+            "active": self.finished_at is None,
+            "route": self.route,
+            "max_requests": self.max_requests,
+            "seconds": self.seconds,
+            "interval_ms": round(self.interval * 1000, 3),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "requests_profiled": self.completed,
+            "samples": self.samples,
+        }
+        if include_results:
+            d["collapsed"] = self.collapsed()
+            d["allocations"] = self.allocations
+        return d
+
+
+class Profiler:
+    """
+    Holds at most one active session. When none is active the middleware
+    does a single attribute check and no sampler thread exists.
+    """
+
+    def __init__(self):
+        self.session: ProfileSession | None = None
+        self.last: ProfileSession | None = None
+        self._lock = threading.Lock()
+
+    def start(self, route: str, max_requests: int | None = None, seconds: float = 30,
+              interval_ms: float = 5, top_n: int = 25) -> ProfileSession:
+        seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError("A profiling session is already running")
+            s = ProfileSession(route, max_requests, seconds, interval_ms, top_n)
+            s.start_tracemalloc()
+            self.session = s
+        threading.Thread(target=self._run, args=(s,), name="qg-profiler", daemon=True).start()
+        return s
+
+    def stop(self) -> ProfileSession | None:
+        s = self.session
+        if s is None:
+            return self.last
+        self._close(s)
+        return s
+
+    def _close(self, s: ProfileSession):
+        # The session stays visible (as active) while the snapshot is taken
+        s.finish()
+        with self._lock:
+            if self.session is s:
+                self.session = None
+                self.last = s
+
+    def _run(self, s: ProfileSession):
+        own = threading.get_ident()
+        while self.session is s and not s.closing and not s.is_done():
+            s.sample(own)
+            time.sleep(s.interval)
+        self._close(s)
+
+
+profiler = Profiler()
+
+
+def profiled(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a callable bound for the threadpool so its worker thread is sampled for admitted requests."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        s = _current.get()
+        if s is None:
+            return fn(*args, **kwargs)
+        s.enter_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            s.exit_thread()
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Tags the threadpool thread that runs a sync endpoint."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The request handler already decided sync vs async from the original call
+        if not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = profiled(self.dependant.call)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        s = profiler.session
+        if s is not None and scope["type"] == "http" and s.matches(scope["path"]):
+            frame = sys._getframe()
+            if s.begin_request(frame):
+                token = _current.set(s)
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    _current.reset(token)
+                    s.end_request(frame)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+import argparse
+import asyncio
+import logging
+import os
+import zlib
+
+from sqlalchemy import (
+    Column, DateTime, Integer, LargeBinary, MetaData, String, Table, create_engine, func, select, text,
+)
+from sqlalchemy.orm import joinedload
+from starlette.concurrency import run_in_threadpool
+
+from .db import SessionLocal, _sqlite_url, engine
+from .models import Analysis
+from .serialize import decode_results, dumps, loads
+from .settings import settings
+from .webhooks import purge_outbox
+
+log = logging.getLogger("qg.retention")
+
+PRUNE_KEEP_FILES = 50  # the detail page only shows the first 50 anyway
+STARTUP_DELAY_SECONDS = 60  # first pass shortly after start, so frequent restarts don't starve it
+
+# ---------- Archive store (separate SQLite file) ----------
+archive_metadata = MetaData()
+archived_analyses = Table(
+    "archived_analyses", archive_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_at", DateTime, index=True),
+    Column("archived_at", DateTime),
+    Column("category", String(16)),
+    Column("info_hash", String(64), index=True),
+    Column("verdict", String(8)),
+    Column("record", LargeBinary),  # zlib-compressed json of the full row
+)
+
+_archive_engine = None
+
+
+def archive_engine():
+    global _archive_engine
+    if _archive_engine is None:
+        _archive_engine = create_engine(_sqlite_url(settings.archive_db_path), connect_args={"check_same_thread": False})
+        archive_metadata.create_all(bind=_archive_engine)
+    return _archive_engine
+
+
+def _archive_record(a: Analysis) -> dict[str, Any]:
+    return {
+        "id": a.id,
+        "created_by_username": (a.created_by_user.username if getattr(a, "created_by_user", None) else None),
+        "created_at": a.created_at.isoformat() + "Z",
+        "created_by": a.created_by,
+        "category": a.category,
+        "input_title": a.input_title,
+        "input_description": a.input_description,
+        "torrent_info_name": a.torrent_info_name,
+        "info_hash": a.info_hash,
+        "announce": loads(a.announce) if a.announce else [],
+        "files": loads(a.files) if a.files else [],
+        "results": a.results,  # kept in stored (compact) form
+    }
+
+
+def load_archived(analysis_id: int) -> dict[str, Any] | None:
+    """Archived analysis in the same shape as the API's analysis dict."""
+    if _archive_engine is None and not os.path.exists(settings.archive_db_path):
+        return None  # nothing archived yet; don't create the file on a read
+    with archive_engine().connect() as conn:
+        blob = conn.execute(
+            select(archived_analyses.c.record).where(archived_analyses.c.id == analysis_id)
+        ).scalar()
+    if blob is None:
+        return None
+    record = loads(zlib.decompress(blob))
+    record["results"] = decode_results(record["results"])
+    record["archived"] = True
+    return record
+
+
+# ---------- Policy steps ----------
+def archive_old(cutoff: datetime, batch_size: int) -> int:
+    """
+    Move analyses created before cutoff into the archive. Each batch is
+    committed to the archive before it is deleted from the hot table, so a
+    crash in between only means the batch is archived again (idempotent).
+    """
+    moved = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Analysis)
+                .options(joinedload(Analysis.created_by_user))
+                .filter(Analysis.created_at < cutoff)
+                .order_by(Analysis.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return moved
+            now = datetime.utcnow()
+            values = []
+            for a in rows:
+                try:
+                    verdict = loads(a.results).get("verdict") if a.results else None
+                except Exception:
+                    verdict = None
+                values.append({
+                    "id": a.id,
+                    "created_at": a.created_at,
+                    "archived_at": now,
+                    "category": a.category,
+                    "info_hash": a.info_hash,
+                    "verdict": verdict,
+                    "record": zlib.compress(dumps(_archive_record(a)).encode("utf-8"), 6),
+                })
+            with archive_engine().begin() as conn:
+                conn.execute(archived_analyses.insert().prefix_with("OR REPLACE"), values)
+            # ORM deletes so mapper hooks (search index) see them
+            for a in rows:
+                db.delete(a)
+            db.commit()
+            moved += len(rows)
+            log.info("archived %d analyses", moved)
+        finally:
+            db.close()
+
+
+def prune_blobs(cutoff: datetime, batch_size: int) -> int:
+    """Drop GuessIt dumps and long file lists from hot rows older than cutoff."""
+    pruned = 0
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Analysis)
+                .filter(
+                    Analysis.id > last_id,
+                    Analysis.created_at < cutoff,
+                    func.json_extract(Analysis.results, "$.pruned").is_(None),
+                )
+                .order_by(Analysis.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return pruned
+            now = datetime.utcnow().isoformat() + "Z"
+            for a in rows:
+                last_id = a.id
+                try:
+                    stored = loads(a.results) if a.results else {}
+                    files = loads(a.files) if a.files else []
+                except Exception:
+                    continue
+                stored.pop("guessit", None)
+                stored["pruned"] = {"at": now, "files_total": len(files)}
+                a.results = dumps(stored)
+                if len(files) > PRUNE_KEEP_FILES:
+                    a.files = dumps(files[:PRUNE_KEEP_FILES])
+            db.commit()
+            pruned += len(rows)
+        finally:
+            db.close()
+
+
+def compact_database():
+    """Reclaim free pages and refresh planner stats; never rewrites the whole file."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            log.warning("database is not in incremental auto-vacuum mode; free pages are not reclaimed "
+                        "(stop the app and run `python -m app.retention --convert` once)")
+        else:
+            # Frees one page per step, but sqlite3 cursors step a statement with
+            # no result columns only once; executescript runs it to completion
+            conn.connection.driver_connection.executescript("PRAGMA incremental_vacuum;")
+        conn.execute(text("ANALYZE"))
+
+
+def convert_auto_vacuum() -> bool:
+    """
+    One-time switch of an existing database to incremental auto-vacuum.
+    Needs a full VACUUM, which locks the database for the whole rewrite,
+    so it is only run on demand. Returns False if already converted.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+            return False
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.execute(text("VACUUM"))
+    return True
+
+
+def run_retention(now: datetime | None = None) -> dict[str, int]:
+    now = now or datetime.utcnow()
+    batch = max(1, settings.retention_batch_size)
+    stats = {"archived": 0, "pruned": 0, "outbox_purged": 0}
+    if settings.retention_archive_days > 0:
+        stats["archived"] = archive_old(now - timedelta(days=settings.retention_archive_days), batch)
+    if settings.retention_prune_days > 0:
+        stats["pruned"] = prune_blobs(now - timedelta(days=settings.retention_prune_days), batch)
+    if settings.webhook_outbox_keep_days > 0:
+        stats["outbox_purged"] = purge_outbox(now - timedelta(days=settings.webhook_outbox_keep_days))
+    compact_database()
+    log.info("retention done: %s", stats)
+    return stats
+
+
+async def run_scheduler():
+    interval = settings.retention_interval_hours * 3600
+    if interval <= 0:
+        return
+    delay = min(STARTUP_DELAY_SECONDS, interval)
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await run_in_threadpool(run_retention)
+        except Exception:
+            log.exception("retention run failed")
+        delay = interval
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m app.retention", description="Archive, prune and compact analyses.")
+    p.add_argument("--convert", action="store_true",
+                   help="switch an existing database to incremental auto-vacuum (full VACUUM; stop the app first)")
+    args = p.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.convert:
+        print("converted" if convert_auto_vacuum() else "already in incremental auto-vacuum mode")
+        return 0
+
+    from .db import Base
+    from .search import ensure_search_index
+
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    print(run_retention())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
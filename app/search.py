@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from typing import Any
+import re
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from .models import Analysis
+from .serialize import loads
+
+FTS_TABLE = "analyses_fts"
+
+# Column weights for bm25(): titles count more than file paths
+RANK = f"bm25({FTS_TABLE}, 10.0, 10.0, 1.0)"
+
+MAX_PER_PAGE = 100
+
+_enabled = False
+
+
+def ensure_search_index(engine):
+    """
+    Create the FTS5 index (SQLite only) and backfill it from existing rows the
+    first time. Afterwards it is maintained incrementally by the mapper events.
+    """
+    global _enabled
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": FTS_TABLE}
+        ).first()
+        if not exists:
+            # unicode61 splits on '.', '-', '_' and '/', so release-name fragments match
+            conn.execute(text(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, info_name, paths)"))
+            conn.execute(text(f"""
+                INSERT INTO {FTS_TABLE}(rowid, title, info_name, paths)
+                SELECT a.id, a.input_title, a.torrent_info_name,
+                       (SELECT group_concat(CASE j.type WHEN 'object' THEN json_extract(j.value, '$.path') ELSE j.value END, char(10))
+                        FROM json_each(a.files) AS j)
+                FROM analyses AS a
+            """))
+    _enabled = True
+
+
+def _paths_text(files_json: str | None) -> str:
+    if not files_json:
+        return ""
+    paths = []
+    for f in loads(files_json):
+        paths.append(str(f.get("path", "")) if isinstance(f, dict) else str(f))
+    return "\n".join(paths)
+
+
+@event.listens_for(Analysis, "after_insert")
+def _index_analysis(mapper, connection, target: Analysis):
+    if not _enabled:
+        return
+    connection.execute(
+        text(f"INSERT INTO {FTS_TABLE}(rowid, title, info_name, paths) VALUES (:id, :title, :info_name, :paths)"),
+        {"id": target.id, "title": target.input_title, "info_name": target.torrent_info_name,
+         "paths": _paths_text(target.files)},
+    )
+
+
+@event.listens_for(Analysis, "after_delete")
+def _unindex_analysis(mapper, connection, target: Analysis):
+    if not _enabled:
+        return
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": target.id})
+
+
+def to_match_query(q: str) -> str | None:
+    # Every word must match (prefix match on the last one for type-ahead)
+    words = re.findall(r"\w+", q or "")
+    if not words:
+        return None
+    terms = ['"' + w + '"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_analyses(db: Session, q: str, page: int = 1, per_page: int = 20) -> dict[str, Any]:
+    """
+    Ranked full-text search over titles, info names and file paths.
+    Fetches one extra row to report has_more instead of counting all matches.
+    """
+    page = max(1, page)
+    per_page = min(max(1, per_page), MAX_PER_PAGE)
+    match = to_match_query(q)
+    if not match or not _enabled:
+        return {"query": q, "page": page, "per_page": per_page, "has_more": False, "items": []}
+
+    rows = db.execute(text(f"""
+        SELECT a.id, a.created_at, a.category, a.input_title, a.torrent_info_name, a.info_hash,
+               json_extract(a.results, '$.verdict') AS verdict, u.username AS created_by_username
+        FROM {FTS_TABLE} AS f
+        JOIN analyses AS a ON a.id = f.rowid
+        LEFT JOIN users AS u ON u.id = a.created_by
+        WHERE {FTS_TABLE} MATCH :match
+        ORDER BY {RANK}
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "limit": per_page + 1, "offset": (page - 1) * per_page}).all()
+
+    return {
+        "query": q,
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(rows) > per_page,
+        "items": rows[:per_page],
+    }
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import Any
+import json
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from .checks import render_message
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except Exception:
+    orjson = None
+    ORJSONResponse = None
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Stored results format version. v2 stores each check as [code, ok] or
+# [code, ok, meta]; messages are rendered from checks.MESSAGES on read.
+RESULTS_VERSION = 2
+CHECK_SECTIONS = ("title_checks", "file_checks", "pack_checks")
+
+
+def dumps(obj: Any) -> str:
+    # default=str: GuessIt can return non-JSON values (Language, Country, ...)
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(raw: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _compact_checks(section: dict[str, Any]) -> dict[str, Any]:
+    out = dict(section)
+    out["checks"] = [
+        [c["code"], bool(c["ok"]), c["meta"]] if c.get("meta") else [c["code"], bool(c["ok"])]
+        for c in section.get("checks") or []
+    ]
+    return out
+
+
+def _expand_checks(section: dict[str, Any]) -> dict[str, Any]:
+    checks = []
+    for c in section.get("checks") or []:
+        if isinstance(c, list):
+            code, ok = c[0], c[1]
+            meta = c[2] if len(c) > 2 else None
+            checks.append({"ok": ok, "code": code, "message": render_message(code, ok, meta), "meta": meta})
+        else:
+            # legacy rows stored full check dicts
+            checks.append(c)
+    out = dict(section)
+    out["checks"] = checks
+    return out
+
+
+def encode_results(results: dict[str, Any]) -> str:
+    """Serialize results for Analysis.results in the compact stored format."""
+    stored = {"v": RESULTS_VERSION}
+    for k, v in results.items():
+        stored[k] = _compact_checks(v) if k in CHECK_SECTIONS and isinstance(v, dict) else v
+    return dumps(stored)
+
+
+def decode_results(raw: str | None) -> dict[str, Any]:
+    """Load Analysis.results (compact or legacy) back into the full format."""
+    if not raw:
+        return {}
+    stored = loads(raw)
+    if stored.pop("v", None) is None:
+        return stored
+    for k in CHECK_SECTIONS:
+        if isinstance(stored.get(k), dict):
+            stored[k] = _expand_checks(stored[k])
+    return stored
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(t in accept for t in MSGPACK_TYPES)
+
+
+def api_response(request: Request, data: Any, status_code: int = 200) -> Response:
+    """JSON via orjson by default; MessagePack when the client asks for it."""
+    headers = {"Vary": "Accept"}
+    if wants_msgpack(request):
+        body = msgpack.packb(data, use_bin_type=True, default=str)
+        return Response(body, status_code=status_code, media_type="application/msgpack", headers=headers)
+    if ORJSONResponse is not None:
+        return ORJSONResponse(data, status_code=status_code, headers=headers)
+    return JSONResponse(data, status_code=status_code, headers=headers)
@@ -15,4 +15,26 @@ class Settings(BaseSettings):
     # Optional external GuessIt REST endpoint (e.g. https://github.com/guessit-io/guessit-rest)
     guessit_rest_url: str | None = None
 
+    # Admission control for analysis endpoints (0 disables a limit)
+    rate_limit_per_minute: float = 30
+    rate_limit_burst: int = 10
+    max_inflight_per_user: int = 2
+    max_inflight_total: int = 16
+
+    # Webhook delivery (outbox)
+    webhook_poll_seconds: float = 2
+    webhook_batch_size: int = 50
+    webhook_max_attempts: int = 10
+    webhook_backoff_seconds: float = 5
+    webhook_backoff_max_seconds: float = 3600
+    webhook_timeout_seconds: float = 10
+    webhook_outbox_keep_days: int = 7          # delivered/dead rows are purged by the retention pass
+
+    # Retention: archive old analyses, prune blobs from hot rows (0 disables a step)
+    archive_db_path: str = "./data/qg-archive.sqlite"
+    retention_archive_days: int = 365
+    retention_prune_days: int = 30
+    retention_interval_hours: float = 24
+    retention_batch_size: int = 500
+
 settings = Settings()
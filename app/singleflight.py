@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    work in the threadpool, callers arriving while it runs await the same
+    result. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    def inflight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            # A task (not the leader's own coroutine) so a disconnecting
+            # leader does not cancel the work for everyone awaiting it.
+            task = asyncio.ensure_future(run_in_threadpool(fn, *args))
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+
+analyses_flight = SingleFlight()
+
+
+def analysis_key(category: str, effective_title: str, info_hash: str | None) -> tuple:
+    # Results depend on the title and category as well as the torrent itself
+    return (category, effective_title, (info_hash or "").lower() or None)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+import urllib.request
+
+from sqlalchemy import event, or_, select
+from starlette.concurrency import run_in_threadpool
+
+from .db import SessionLocal
+from .models import Analysis, WebhookOutbox, WebhookSubscription
+from .serialize import dumps, loads
+from .settings import settings
+
+log = logging.getLogger("qg.webhooks")
+
+EVENT_ANALYSIS_CREATED = "analysis.created"
+SIGNATURE_HEADER = "X-QG-Signature"
+TIMESTAMP_HEADER = "X-QG-Timestamp"
+LEASE_SECONDS = 60  # claimed rows are retried after this if the process dies mid-send
+
+
+def verdict_payload(a: Analysis) -> dict[str, Any]:
+    try:
+        r = loads(a.results) if a.results else {}
+    except Exception:
+        r = {}
+    return {
+        "event": EVENT_ANALYSIS_CREATED,
+        "analysis_id": a.id,
+        "created_at": (a.created_at or datetime.utcnow()).isoformat() + "Z",
+        "category": a.category,
+        "title": a.input_title or a.torrent_info_name,
+        "info_hash": a.info_hash,
+        "verdict": r.get("verdict"),
+        "reason": r.get("reason"),
+        "reason_code": r.get("reason_code"),
+    }
+
+
+@event.listens_for(Analysis, "after_insert")
+def _enqueue_verdict(mapper, connection, target: Analysis):
+    # Same transaction as the analysis row: committed together or not at all
+    sub_ids = connection.execute(
+        select(WebhookSubscription.id).where(WebhookSubscription.active.is_(True))
+    ).scalars().all()
+    if not sub_ids:
+        return
+    payload = verdict_payload(target)
+    now = datetime.utcnow()
+    connection.execute(WebhookOutbox.__table__.insert(), [
+        {
+            "subscription_id": sid,
+            "analysis_id": target.id,
+            "payload": dumps(payload),
+            "created_at": now,
+            "attempts": 0,
+            "next_attempt_at": now,
+        }
+        for sid in sub_ids
+    ])
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    mac = hmac.new(secret.encode("utf-8"), timestamp.encode("ascii") + b"." + body, hashlib.sha256)
+    return "sha256=" + mac.hexdigest()
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(settings.webhook_backoff_seconds * (2 ** max(0, attempts - 1)), settings.webhook_backoff_max_seconds)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # urllib would turn a redirected POST into a bodiless GET and report success;
+    # refusing makes any 3xx an HTTPError, so the batch is retried like other non-2xx
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def _post(url: str, secret: str, body: bytes):
+    ts = str(int(time.time()))
+    req = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": "application/json",
+        "User-Agent": "QualityGateway-Webhooks",
+        TIMESTAMP_HEADER: ts,
+        SIGNATURE_HEADER: sign(secret, ts, body),
+    })
+    with _opener.open(req, timeout=settings.webhook_timeout_seconds) as r:
+        r.read()
+
+
+@dataclass
+class Target:
+    id: int
+    url: str
+    secret: str
+
+
+def _claim_due(limit: int) -> list[tuple[Target, list[tuple[int, str]]]]:
+    """Lease due rows so a crash mid-send only delays (never drops) them."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        # Rows of paused subscriptions stay queued until they are resumed
+        rows = (
+            db.query(WebhookOutbox)
+            .join(WebhookSubscription, WebhookSubscription.id == WebhookOutbox.subscription_id)
+            .filter(
+                WebhookSubscription.active.is_(True),
+                WebhookOutbox.delivered_at.is_(None),
+                WebhookOutbox.next_attempt_at <= now,
+                WebhookOutbox.attempts < settings.webhook_max_attempts,
+            )
+            .order_by(WebhookOutbox.id.asc())
+            .limit(limit)
+            .all()
+        )
+        if not rows:
+            return []
+        lease_until = now + timedelta(seconds=LEASE_SECONDS)
+        grouped: dict[int, list[tuple[int, str]]] = {}
+        for row in rows:
+            row.next_attempt_at = lease_until
+            grouped.setdefault(row.subscription_id, []).append((row.id, row.payload))
+        subs = {
+            s.id: Target(s.id, s.url, s.secret)
+            for s in db.query(WebhookSubscription).filter(WebhookSubscription.id.in_(grouped))
+        }
+        db.commit()
+        return [(subs[sid], items) for sid, items in grouped.items() if sid in subs]
+    finally:
+        db.close()
+
+
+def _record(ids: list[int], error: str | None):
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for row in db.query(WebhookOutbox).filter(WebhookOutbox.id.in_(ids)):
+            if error is None:
+                row.delivered_at = now
+                row.last_error = None
+            else:
+                row.attempts += 1
+                row.last_error = error[:1000]
+                row.next_attempt_at = now + timedelta(seconds=backoff_seconds(row.attempts))
+        db.commit()
+    finally:
+        db.close()
+
+
+def dispatch_once() -> int:
+    """Send one round of due deliveries, batched per subscription. Returns rows delivered."""
+    batch = max(1, settings.webhook_batch_size)
+    delivered = 0
+    for sub, items in _claim_due(batch * 10):
+        for i in range(0, len(items), batch):
+            chunk = items[i:i + batch]
+            ids = [row_id for row_id, _ in chunk]
+            # Payloads are stored json; splice them instead of re-encoding
+            body = ('{"deliveries":[' + ",".join(
+                '{"delivery_id":%d,"data":%s}' % (row_id, payload) for row_id, payload in chunk
+            ) + "]}").encode("utf-8")
+            try:
+                _post(sub.url, sub.secret, body)
+            except Exception as e:
+                log.warning("webhook %s delivery failed: %s", sub.id, e)
+                _record(ids, f"{type(e).__name__}: {e}")
+            else:
+                _record(ids, None)
+                delivered += len(ids)
+    return delivered
+
+
+def purge_outbox(cutoff: datetime) -> int:
+    """Delete rows created before cutoff that were delivered or ran out of attempts."""
+    db = SessionLocal()
+    try:
+        n = (
+            db.query(WebhookOutbox)
+            .filter(
+                WebhookOutbox.created_at < cutoff,
+                or_(
+                    WebhookOutbox.delivered_at.is_not(None),
+                    WebhookOutbox.attempts >= settings.webhook_max_attempts,
+                ),
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+async def run_dispatcher():
+    while True:
+        try:
+            sent = await run_in_threadpool(dispatch_once)
+        except Exception:
+            log.exception("webhook dispatcher error")
+            sent = 0
+        if not sent:
+            await asyncio.sleep(settings.webhook_poll_seconds)
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings and the engine are created at import time: point them at a scratch
+# directory before anything under app/ is imported.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_tmp = tempfile.mkdtemp(prefix="qg-tests-")
+os.environ.setdefault("QG_SECRET_KEY", "test-secret")
+os.environ["QG_DB_PATH"] = os.path.join(_tmp, "qg.sqlite")
+os.environ["QG_ARCHIVE_DB_PATH"] = os.path.join(_tmp, "qg-archive.sqlite")
+os.environ["QG_RETENTION_INTERVAL_HOURS"] = "0"
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.search import FTS_TABLE, ensure_search_index  # noqa: E402
+from app import webhooks  # noqa: E402,F401  (registers the outbox enqueue hook)
+
+
+@pytest.fixture
+def db():
+    # Fresh schema per test; the FTS index is not part of Base.metadata
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    from app.auth import hash_password
+    from app.models import User
+
+    u = User(username="admin", password_hash=hash_password("pw"), is_admin=True)
+    db.add(u)
+    db.commit()
+    return u
+
+
+@pytest.fixture
+def client(user, monkeypatch):
+    """Logged-in TestClient; templates and static files resolve from the repo root."""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(ROOT)
+    from app.main import app
+
+    with TestClient(app) as c:
+        c.post("/login", data={"username": "admin", "password": "pw"})
+        yield c
@@ -0,0 +1,51 @@
+import json
+
+from app import export
+from app.db import SessionLocal
+from app.models import Analysis, User
+from app.serialize import dumps
+
+
+def add_analyses(db, n):
+    user = User(username="admin", password_hash="x", is_admin=True)
+    db.add(user)
+    db.commit()
+    for i in range(n):
+        db.add(Analysis(
+            created_by=user.id, category="TV" if i % 2 else "Movie", input_title=f"Title.{i}",
+            results=dumps({"verdict": "fail" if i % 3 == 0 else "pass"}),
+        ))
+    db.commit()
+
+
+def test_export_pages_through_all_rows(db, monkeypatch):
+    monkeypatch.setattr(export, "FETCH_SIZE", 3)
+    add_analyses(db, 10)
+
+    rows = [json.loads(line) for line in export.stream_export("ndjson", "id,input_title,verdict")]
+    assert [r["id"] for r in rows] == list(range(1, 11))
+    assert rows[3] == {"id": 4, "input_title": "Title.3", "verdict": "fail"}
+
+    rows = [json.loads(line) for line in export.stream_export("ndjson", "input_title", verdict="fail")]
+    assert [r["input_title"] for r in rows] == ["Title.0", "Title.3", "Title.6", "Title.9"]
+
+    csv_text = "".join(export.stream_export("csv", "id,category,created_by_username", category="TV"))
+    assert csv_text.splitlines() == ["id,category,created_by_username"] + [f"{i},TV,admin" for i in (2, 4, 6, 8, 10)]
+
+
+def test_paused_export_does_not_block_writers(db, monkeypatch):
+    monkeypatch.setattr(export, "FETCH_SIZE", 2)
+    add_analyses(db, 5)
+
+    chunks = export.stream_export("ndjson", "id")
+    first = next(chunks)  # a slow client holding the stream open
+
+    writer = SessionLocal()
+    try:
+        writer.add(Analysis(created_by=1, category="Movie", input_title="Late", results=dumps({"verdict": "pass"})))
+        writer.commit()
+    finally:
+        writer.close()
+
+    ids = [json.loads(line)["id"] for line in [first, *chunks]]
+    assert ids == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+
+from app import limits
+from app.limits import AdmissionController
+
+
+def rejection(controller, user_id) -> HTTPException:
+    with pytest.raises(HTTPException) as e:
+        controller.acquire(user_id)
+    assert e.value.status_code == 429
+    return e.value
+
+
+def test_token_bucket_rejects_after_burst():
+    c = AdmissionController(rate_per_minute=6, burst=2, max_inflight_per_user=0, max_inflight_total=0)
+    c.acquire(1)
+    c.release(1)
+    c.acquire(1)
+    c.release(1)
+
+    e = rejection(c, 1)
+    assert e.detail == "Rate limit exceeded"
+    assert 1 <= int(e.headers["Retry-After"]) <= 10  # one token per 10s
+
+    c.acquire(2)  # buckets are per user
+
+
+def test_inflight_caps_until_release():
+    c = AdmissionController(rate_per_minute=0, burst=1, max_inflight_per_user=1, max_inflight_total=2)
+    c.acquire(1)
+    assert rejection(c, 1).detail == "Too many concurrent analyses for this user"
+    c.acquire(2)
+    e = rejection(c, 3)
+    assert e.detail.startswith("Server busy")
+    assert e.headers["Retry-After"] == "1"
+
+    c.release(1)
+    c.acquire(3)
+
+
+@pytest.fixture
+def strict(monkeypatch):
+    c = AdmissionController(rate_per_minute=1, burst=1, max_inflight_per_user=0, max_inflight_total=0)
+    monkeypatch.setattr(limits, "admission", c)
+    return c
+
+
+def test_api_returns_429_with_retry_after(client, strict):
+    assert client.post("/api/analyses", data={"category": "Movie"}).status_code == 400  # admitted, no file
+
+    r = client.post("/api/analyses", data={"category": "Movie"})
+    assert r.status_code == 429
+    assert r.json() == {"detail": "Rate limit exceeded"}
+    assert int(r.headers["Retry-After"]) > 0
+
+
+def test_form_rerenders_page_on_429(client, strict):
+    client.post("/analyses/new", data={"category": "Movie"})
+
+    r = client.post("/analyses/new", data={"category": "Movie"})
+    assert r.status_code == 429
+    assert r.headers["content-type"].startswith("text/html")
+    assert "Rate limit exceeded" in r.text
+    assert int(r.headers["Retry-After"]) > 0
+    assert strict._total == 0  # nothing left in flight
@@ -0,0 +1,56 @@
+from app import pack
+from app.pack import analyze_pack
+
+
+def no_guessit(name):
+    raise AssertionError(f"GuessIt should not be needed for {name}")
+
+
+def checks(res):
+    return {c["code"]: c for c in res["checks"]}
+
+
+def test_split_season_pack_is_not_missing_leading_episodes():
+    files = [f"Show.S02E{i:02d}.1080p.WEB-DL.x264-GRP.mkv" for i in range(13, 25)]
+    res = analyze_pack(files, guess_fn=no_guessit)
+
+    c = checks(res)
+    assert res["verdict"] == "pass"
+    assert c["missing_episodes"]["ok"]
+    assert c["partial_season"] == {
+        "code": "partial_season", "ok": True,
+        "message": "Partial season pack, starts at S02E13", "meta": {"starts_at": "S02E13"},
+    }
+
+
+def test_gaps_inside_the_range_are_missing():
+    files = [f"Show.S02E{i:02d}.1080p.WEB-DL.x264-GRP.mkv" for i in (13, 14, 16, 18)]
+    c = checks(analyze_pack(files, guess_fn=no_guessit))
+
+    assert not c["missing_episodes"]["ok"]
+    assert c["missing_episodes"]["meta"] == {"count": 2, "episodes": ["S02E15", "S02E17"]}
+
+
+def test_cross_notation_uses_the_regex_prepass():
+    files = [f"Show.1x{i:02d}.720p.HDTV.x264-GRP.mkv" for i in range(1, 11)]
+    files.append("Show.1x12.1920x1080.HDTV.x264-GRP.mkv")
+    res = analyze_pack(files, guess_fn=no_guessit)
+
+    assert res["episode_files"] == 11
+    assert checks(res)["missing_episodes"]["meta"]["episodes"] == ["S01E11"]
+
+
+def test_guessit_fallbacks_are_capped(monkeypatch):
+    monkeypatch.setattr(pack, "MAX_GUESSIT_FALLBACKS", 3)
+    calls = []
+
+    def fake_guess(name):
+        calls.append(name)
+        return {"season": 1, "episode": len(calls)}
+
+    files = [f"Show Episode {i} Title.mkv" for i in range(1, 11)]
+    res = analyze_pack(files, guess_fn=fake_guess)
+
+    assert len(calls) == 3
+    assert res["episode_files"] == 3
+    assert res["unparsed_files"] == 7
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import retention
+from app.db import engine
+from app.models import Analysis, User
+from app.serialize import dumps
+
+
+def pragma(name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_compact_reclaims_every_free_page(db):
+    assert pragma("auto_vacuum") == 2
+    db.add(User(username="admin", password_hash="x"))
+    db.commit()
+    db.add_all([
+        Analysis(created_by=1, category="Movie", input_title=f"T{i}", results="{}",
+                 files=dumps([{"path": "x" * 2000}]))
+        for i in range(500)
+    ])
+    db.commit()
+    db.query(Analysis).delete()
+    db.commit()
+    assert pragma("freelist_count") > 100
+
+    retention.compact_database()
+
+    assert pragma("freelist_count") == 0
+
+
+def test_missing_archive_is_not_created_on_read(db, monkeypatch, tmp_path):
+    path = tmp_path / "archive.sqlite"
+    monkeypatch.setattr(retention.settings, "archive_db_path", str(path))
+    monkeypatch.setattr(retention, "_archive_engine", None)
+
+    assert retention.load_archived(1) is None
+    assert not path.exists()
+
+
+def test_archived_rows_are_served_from_the_archive(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(retention.settings, "archive_db_path", str(tmp_path / "archive.sqlite"))
+    monkeypatch.setattr(retention, "_archive_engine", None)
+    db.add(User(username="admin", password_hash="x"))
+    db.commit()
+    a = Analysis(created_by=1, category="Movie", input_title="Old", created_at=datetime.utcnow() - timedelta(days=400),
+                 results=dumps({"verdict": "fail"}))
+    db.add(a)
+    db.commit()
+    aid = a.id
+
+    assert retention.archive_old(datetime.utcnow() - timedelta(days=365), 100) == 1
+
+    db.expire_all()
+    assert db.query(Analysis).count() == 0
+    record = retention.load_archived(aid)
+    assert record["archived"] is True
+    assert record["input_title"] == "Old"
+    assert record["results"]["verdict"] == "fail"
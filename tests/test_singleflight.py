@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
+import time
+
+from torf import Torrent
+
+from app import main
+from app.models import Analysis
+
+
+def make_torrent(tmp_path, name: str) -> bytes:
+    root = tmp_path / name
+    root.mkdir()
+    (root / f"{name}.mkv").write_bytes(b"x" * 100)
+    t = Torrent(path=str(root), trackers=["http://tracker.invalid/announce"])
+    t.generate()
+    buf = io.BytesIO()
+    t.write_stream(buf)
+    return buf.getvalue()
+
+
+def test_concurrent_identical_uploads_share_one_run(client, db, tmp_path, monkeypatch):
+    real = main.make_results
+    calls = []
+    lock = threading.Lock()
+
+    def slow_make_results(*args):
+        with lock:
+            calls.append(args[1])
+        time.sleep(0.5)  # keep the run in flight while the second upload arrives
+        return real(*args)
+
+    monkeypatch.setattr(main, "make_results", slow_make_results)
+    torrent = make_torrent(tmp_path, "Movie.2020.1080p.WEB-DL.x264-GRP")
+
+    def upload(_):
+        return client.post("/api/analyses", data={"category": "Movie"}, files={"torrent_file": ("a.torrent", torrent)})
+
+    with ThreadPoolExecutor(2) as pool:
+        responses = list(pool.map(upload, range(2)))
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert calls == ["Movie.2020.1080p.WEB-DL.x264-GRP"]
+    ids = {r.json()["id"] for r in responses}
+    assert len(ids) == 2
+    assert responses[0].json()["results"] == responses[1].json()["results"]
+    assert db.query(Analysis).count() == 2
+
+    # Nothing is cached once the run completes
+    upload(None)
+    assert len(calls) == 2
@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import pytest
+
+from app import webhooks
+from app.models import Analysis, User, WebhookOutbox, WebhookSubscription
+from app.serialize import dumps
+from app.settings import settings
+
+
+class Receiver:
+    """Local stand-in for a subscriber: records requests, answers with queued status codes (200 once empty)."""
+
+    def __init__(self):
+        self.requests: list[tuple[Any, bytes]] = []  # (case-insensitive headers, body)
+        self.statuses: list[int] = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append((self.headers, body))
+                status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                if 300 <= status < 400:
+                    self.send_header("Location", "/moved")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                receiver.requests.append((self.headers, b""))
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def deliveries(self, i: int) -> list[dict]:
+        return json.loads(self.requests[i][1])["deliveries"]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def receiver():
+    r = Receiver()
+    yield r
+    r.close()
+
+
+@pytest.fixture
+def subscription(db, receiver):
+    user = User(username="admin", password_hash="x", is_admin=True)
+    db.add(user)
+    db.commit()
+    sub = WebhookSubscription(url=receiver.url, secret="s3cret", active=True, created_by=user.id)
+    db.add(sub)
+    db.commit()
+    return sub
+
+
+def add_analysis(db, title="Movie.2020.1080p.WEB-DL.x264-GRP", verdict="fail"):
+    a = Analysis(
+        created_by=1, category="Movie", input_title=title, info_hash="ab" * 20,
+        results=dumps({"verdict": verdict, "reason": "Naming wrong", "reason_code": "dot_style"}),
+    )
+    db.add(a)
+    db.commit()
+    return a
+
+
+def outbox(db) -> list[WebhookOutbox]:
+    db.expire_all()
+    return db.query(WebhookOutbox).order_by(WebhookOutbox.id.asc()).all()
+
+
+def test_delivery_body_and_signature(db, subscription, receiver):
+    a = add_analysis(db)
+
+    assert webhooks.dispatch_once() == 1
+
+    assert len(receiver.requests) == 1
+    headers, body = receiver.requests[0]
+    ts = headers[webhooks.TIMESTAMP_HEADER]
+    expected = "sha256=" + hmac.new(b"s3cret", ts.encode() + b"." + body, hashlib.sha256).hexdigest()
+    assert headers[webhooks.SIGNATURE_HEADER] == expected
+    assert headers["Content-Type"] == "application/json"
+
+    [delivery] = receiver.deliveries(0)
+    row = outbox(db)[0]
+    assert delivery["delivery_id"] == row.id
+    assert delivery["data"]["event"] == webhooks.EVENT_ANALYSIS_CREATED
+    assert delivery["data"]["analysis_id"] == a.id
+    assert delivery["data"]["verdict"] == "fail"
+    assert delivery["data"]["reason_code"] == "dot_style"
+    assert row.delivered_at is not None
+
+
+def test_deliveries_are_batched(db, subscription, receiver, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_batch_size", 2)
+    for i in range(5):
+        add_analysis(db, title=f"Movie{i}.2020.1080p.WEB-DL.x264-GRP")
+
+    assert webhooks.dispatch_once() == 5
+
+    sizes = [len(receiver.deliveries(i)) for i in range(len(receiver.requests))]
+    assert sizes == [2, 2, 1]
+    ids = [d["delivery_id"] for i in range(3) for d in receiver.deliveries(i)]
+    assert ids == [row.id for row in outbox(db)]
+
+
+def test_non_2xx_is_retried_with_backoff(db, subscription, receiver, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_backoff_seconds", 30)
+    monkeypatch.setattr(settings, "webhook_backoff_max_seconds", 100)
+    assert [webhooks.backoff_seconds(n) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+    receiver.statuses = [500]
+    add_analysis(db)
+
+    before = datetime.utcnow()
+    assert webhooks.dispatch_once() == 0
+    [row] = outbox(db)
+    assert row.attempts == 1
+    assert row.delivered_at is None
+    assert "500" in row.last_error
+    assert before + timedelta(seconds=29) <= row.next_attempt_at <= datetime.utcnow() + timedelta(seconds=30)
+
+    # Not due yet: nothing is sent
+    assert webhooks.dispatch_once() == 0
+    assert len(receiver.requests) == 1
+
+    row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert webhooks.dispatch_once() == 1
+    assert len(receiver.requests) == 2
+    [row] = outbox(db)
+    assert row.delivered_at is not None
+    assert row.last_error is None
+
+
+def test_redirect_is_not_followed_and_is_retried(db, subscription, receiver, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_backoff_seconds", 0)
+    receiver.statuses = [301]
+    add_analysis(db)
+
+    assert webhooks.dispatch_once() == 0
+    assert len(receiver.requests) == 1  # no follow-up GET to the Location
+    [row] = outbox(db)
+    assert row.delivered_at is None
+    assert row.attempts == 1
+    assert "301" in row.last_error
+
+    assert webhooks.dispatch_once() == 1
+    assert receiver.deliveries(1)[0]["delivery_id"] == row.id
+
+
+def test_gives_up_after_max_attempts(db, subscription, receiver, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_backoff_seconds", 0)
+    monkeypatch.setattr(settings, "webhook_max_attempts", 2)
+    receiver.statuses = [503, 503, 503]
+    add_analysis(db)
+
+    webhooks.dispatch_once()
+    webhooks.dispatch_once()
+    webhooks.dispatch_once()
+
+    assert len(receiver.requests) == 2
+    [row] = outbox(db)
+    assert row.attempts == 2
+    assert row.delivered_at is None
+
+
+def test_expired_lease_makes_rows_due_again(db, subscription, receiver, monkeypatch):
+    monkeypatch.setattr(webhooks, "LEASE_SECONDS", 0.3)
+    add_analysis(db)
+
+    # A dispatcher claims the row and dies before sending
+    [(target, items)] = webhooks._claim_due(10)
+    assert target.url == receiver.url and len(items) == 1
+
+    # Leased: not handed out again while the lease holds
+    assert webhooks.dispatch_once() == 0
+    assert receiver.requests == []
+
+    time.sleep(0.4)
+    assert webhooks.dispatch_once() == 1
+    assert len(receiver.requests) == 1
+
+
+def test_paused_subscription_holds_queued_rows(db, subscription, receiver):
+    add_analysis(db)
+    subscription.active = False
+    db.commit()
+
+    assert webhooks.dispatch_once() == 0
+    add_analysis(db, title="Other.2021.1080p.WEB-DL.x264-GRP")  # not queued while paused
+    [row] = outbox(db)
+    assert row.attempts == 0
+
+    subscription.active = True
+    db.commit()
+    assert webhooks.dispatch_once() == 1
+    assert len(receiver.requests) == 1
+
+
+def test_purge_outbox_keeps_pending_rows(db, subscription, receiver, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_max_attempts", 1)
+    receiver.statuses = [500]
+    add_analysis(db)               # dead after one failure
+    webhooks.dispatch_once()
+    add_analysis(db)               # delivered
+    webhooks.dispatch_once()
+    subscription.active = False
+    db.commit()
+    add_analysis(db)               # nothing queued for a paused subscription
+    subscription.active = True
+    db.commit()
+    add_analysis(db)               # still pending
+
+    assert webhooks.purge_outbox(datetime.utcnow() - timedelta(days=1)) == 0
+    assert webhooks.purge_outbox(datetime.utcnow() + timedelta(seconds=1)) == 2
+    [row] = outbox(db)
+    assert row.delivered_at is None and row.attempts == 0